@@ -27,17 +27,47 @@ Python: 3.8+
 Flask: 2.0+
 """
 
-from flask import Flask, request, jsonify, send_from_directory, make_response
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context, abort
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import orjson
+import numpy as np
 import json
+import math
 import os
 import csv
-import io
+import gzip
+import hashlib
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, wraps
 from typing import List, Dict, Any, Optional, Union, Tuple
+from uuid import uuid4
 from database import DatabaseManager
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson for faster API responses"""
+    
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        # Hand orjson's bytes straight to the response without a str round-trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
 app = Flask(__name__, static_folder='.', static_url_path='')
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for frontend integration
 
 # Configuration
@@ -47,33 +77,32 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 # Initialize database
 db = DatabaseManager('smartgrades.db')
 
+# CSV imports run here so large uploads don't hold a request thread
+IMPORT_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix='csv-import')
+
 # Grade calculation utilities
 def clamp(value: float, min_val: float = 0, max_val: float = 100) -> float:
     """Clamp a value between min and max bounds"""
+    if value is None:
+        return 0.0
     try:
-        if value is None:
-            return 0.0
         num_val = float(value)
-        return float(max(min_val, min(max_val, num_val)))
     except (ValueError, TypeError):
         return 0.0
+    # Written so NaN falls through to max_val, as max(min_val, min(max_val, nan)) did
+    return float(min_val) if num_val < min_val else num_val if num_val <= max_val else float(max_val)
+
+# Grade lookup tables indexed by whole percentage (0-100)
+LETTER_GRADE_TABLE = tuple("E" * 60 + "D" * 10 + "C" * 10 + "B" * 10 + "A" * 11)
+HSC_BAND_TABLE = tuple(
+    ["Band 1"] * 50 + ["Band 2"] * 10 + ["Band 3"] * 10 +
+    ["Band 4"] * 10 + ["Band 5"] * 10 + ["Band 6"] * 11
+)
 
 def to_letter_grade(percentage: float) -> str:
     """Convert percentage to letter grade"""
-    if percentage is None:
-        return "E"
     try:
-        pct = float(percentage)
-        if pct >= 90:
-            return "A"
-        elif pct >= 80:
-            return "B"
-        elif pct >= 70:
-            return "C"
-        elif pct >= 60:
-            return "D"
-        else:
-            return "E"
+        return LETTER_GRADE_TABLE[int(min(100.0, max(0.0, float(percentage))))]
     except (ValueError, TypeError):
         return "E"
 
@@ -109,51 +138,173 @@ def to_hsc_band(percentage: float) -> str:
         This function implements the official NSW HSC band descriptors
         and is used for Australian educational reporting standards.
     """
-    if percentage is None:
-        return "Band 1"
     try:
-        pct = float(percentage)
-        if pct >= 90:
-            return "Band 6"
-        elif pct >= 80:
-            return "Band 5"
-        elif pct >= 70:
-            return "Band 4"
-        elif pct >= 60:
-            return "Band 3"
-        elif pct >= 50:
-            return "Band 2"
-        else:
-            return "Band 1"
+        return HSC_BAND_TABLE[int(min(100.0, max(0.0, float(percentage))))]
     except (ValueError, TypeError):
         return "Band 1"
 
+# Required JSON fields for POST payloads
+TEACHER_FIELDS = frozenset(('name',))
+CLASS_FIELDS = frozenset(('class_name', 'subject'))
+STUDENT_FIELDS = ('student_id', 'first_name', 'last_name')  # Checked in order for the error message
+ASSESSMENT_FIELDS = frozenset(('name', 'weight'))
+GRADE_FIELDS = frozenset(('score',))
+
+def has_fields(data: Any, fields: frozenset) -> bool:
+    """Check that a decoded JSON payload is an object containing every required field"""
+    return isinstance(data, dict) and fields <= data.keys()
+
+def is_missing_parent_error(error: Exception) -> bool:
+    """Check whether a write failed because a row it references (teacher, class, ...) doesn't exist"""
+    return isinstance(error, sqlite3.IntegrityError) and 'FOREIGN KEY constraint failed' in str(error)
+
+# Appended to an ETag when the body is gzipped: a strong ETag must differ between encodings
+GZIP_ETAG_SUFFIX = '-gzip'
+
+def _if_none_match(etag: str) -> Optional[str]:
+    """The encoding variant of etag that the request's If-None-Match holds, if any"""
+    for candidate in (etag, etag + GZIP_ETAG_SUFFIX):
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+def conditional_get(*tables: str):
+    """
+    Tag a GET route's response with an ETag built from the data versions of the
+    tables it reads, and answer a matching If-None-Match with 304 Not Modified
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = f"v{db.get_data_version(tables)}"
+            matched_etag = _if_none_match(etag)
+            if matched_etag:
+                response = Response(status=304)
+                etag = matched_etag
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # compress_response adds the gzip suffix if it compresses the body
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            # A 304 must carry the same Vary as the 200 it revalidates
+            response.vary.add('Accept-Encoding')
+            return response
+        return wrapper
+    return decorator
+
+# Static assets are read and gzip-compressed once at startup and served from memory
+STATIC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _load_static_asset(filename: str, mimetype: str) -> Optional[Dict[str, Any]]:
+    """Read a static file into memory along with its gzip body and ETag"""
+    try:
+        with open(os.path.join(STATIC_DIR, filename), 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return None
+    return {
+        'raw': raw,
+        'gzip': gzip.compress(raw, 6),
+        'etag': hashlib.md5(raw).hexdigest(),
+        'mimetype': mimetype
+    }
+
+STATIC_ASSETS = {
+    'index.html': _load_static_asset('index.html', 'text/html'),
+    'app.html': _load_static_asset('app.html', 'text/html'),
+    'styles.css': _load_static_asset('styles.css', 'text/css'),
+    'script.js': _load_static_asset('script.js', 'text/javascript')
+}
+
+def _serve_static_asset(filename: str) -> Response:
+    """Serve a cached static asset, answering conditional requests with 304"""
+    asset = STATIC_ASSETS.get(filename)
+    if asset is None:
+        abort(404)
+    
+    etag = _if_none_match(asset['etag'])
+    if etag:
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(asset['gzip'], mimetype=asset['mimetype'])
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = asset['etag'] + GZIP_ETAG_SUFFIX
+    else:
+        response = Response(asset['raw'], mimetype=asset['mimetype'])
+        etag = asset['etag']
+    
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# Text responses at least this large are gzip-compressed when the client accepts it
+COMPRESSIBLE_MIMETYPES = frozenset({'application/json', 'text/csv'})
+COMPRESS_MIN_SIZE = 500
+
+def _precompressed_response(raw: bytes, compressed: bytes, mimetype: str) -> Response:
+    """Serve a body that was gzip-compressed ahead of time, picking the encoding the client accepts"""
+    if 'gzip' in request.accept_encodings:
+        response = Response(compressed, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(raw, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """Gzip JSON and CSV bodies that were not already compressed or streamed"""
+    if (response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings:
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    response.set_data(gzip.compress(data, 6))
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX)
+    return response
+
 # Routes for static files
 @app.route('/')
 def index():
     """Serve the main HTML page"""
-    return send_from_directory('.', 'index.html')
+    return _serve_static_asset('index.html')
 
 @app.route('/app')
 def app_page():
     """Serve the application HTML page"""
-    return send_from_directory('.', 'app.html')
+    return _serve_static_asset('app.html')
 
 @app.route('/styles.css')
 def styles():
     """Serve CSS file"""
-    return send_from_directory('.', 'styles.css', mimetype='text/css')
+    return _serve_static_asset('styles.css')
 
 @app.route('/script.js')
 def script():
     """Serve JavaScript file"""
-    return send_from_directory('.', 'script.js', mimetype='text/javascript')
+    return _serve_static_asset('script.js')
 
 # ===============================
 # TEACHER MANAGEMENT API
 # ===============================
 
 @app.route('/api/teachers', methods=['GET'])
+@conditional_get('teachers')
 def get_teachers():
     """Get all teachers"""
     try:
@@ -168,7 +319,7 @@ def add_teacher():
     """Add a new teacher"""
     try:
         data = request.get_json()
-        if not data or 'name' not in data:
+        if not has_fields(data, TEACHER_FIELDS):
             return jsonify({'error': 'Teacher name is required'}), 400
         
         email = data.get('email', '').strip()
@@ -193,6 +344,7 @@ def add_teacher():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/teachers/<int:teacher_id>', methods=['GET'])
+@conditional_get('teachers')
 def get_teacher(teacher_id):
     """Get specific teacher"""
     try:
@@ -222,6 +374,7 @@ def delete_teacher(teacher_id):
 # ===============================
 
 @app.route('/api/teachers/<int:teacher_id>/classes', methods=['GET'])
+@conditional_get('classes', 'class_enrollments')
 def get_teacher_classes(teacher_id):
     """Get all classes for a teacher"""
     try:
@@ -236,9 +389,8 @@ def add_class(teacher_id):
     """Add a new class for a teacher"""
     try:
         data = request.get_json()
-        required_fields = ['class_name', 'subject']
         
-        if not data or not all(field in data for field in required_fields):
+        if not has_fields(data, CLASS_FIELDS):
             return jsonify({'error': 'Missing required fields (class_name, subject)'}), 400
         
         class_id = db.add_class(
@@ -253,9 +405,12 @@ def add_class(teacher_id):
         return jsonify({'message': 'Class added successfully', 'id': class_id})
     except Exception as e:
         app.logger.error(f"Error adding class: {e}")
+        if is_missing_parent_error(e):
+            return jsonify({'error': 'Teacher not found'}), 404
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/classes/<int:class_id>', methods=['GET'])
+@conditional_get('classes', 'teachers')
 def get_class(class_id):
     """Get specific class with teacher info"""
     try:
@@ -298,21 +453,20 @@ def delete_enrollment(enrollment_id):
 # ===============================
 
 @app.route('/api/classes/<int:class_id>/students', methods=['GET'])
+@conditional_get('students', 'class_enrollments', 'assessments', 'student_grades')
 def get_class_students(class_id):
     """Get all students in a class"""
     try:
         students = db.get_class_students(class_id)
+        grade_calcs = db.calculate_grades_for_class(class_id)
         
-        # Add grade calculations for each student
-        enriched_students = []
+        # Add grade calculations for each student (rows are already fresh dicts, so extend in place)
         for student in students:
-            grade_calc = db.calculate_student_grade(student['enrollment_id'])
-            student_data = dict(student)
-            student_data.update(grade_calc)
-            student_data['letter_grade'] = to_letter_grade(grade_calc['predicted'])
-            enriched_students.append(student_data)
+            grade_calc = grade_calcs.get(student['enrollment_id']) or db.calculate_student_grade(student['enrollment_id'])
+            student.update(grade_calc)
+            student['letter_grade'] = to_letter_grade(grade_calc['predicted'])
         
-        return jsonify({'students': enriched_students})
+        return jsonify({'students': students})
     except Exception as e:
         app.logger.error(f"Error getting class students: {e}")
         return jsonify({'error': str(e)}), 500
@@ -325,6 +479,8 @@ def enroll_student(class_id, student_id):
         return jsonify({'message': 'Student enrolled successfully', 'enrollment_id': enrollment_id})
     except Exception as e:
         app.logger.error(f"Error enrolling student: {e}")
+        if is_missing_parent_error(e):
+            return jsonify({'error': 'Class not found'}), 404
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/students', methods=['POST'])
@@ -336,8 +492,7 @@ def add_student():
             return jsonify({'error': 'No data provided'}), 400
         
         # Validate required fields
-        required_fields = ['student_id', 'first_name', 'last_name']
-        for field in required_fields:
+        for field in STUDENT_FIELDS:
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
@@ -359,6 +514,7 @@ def add_student():
 # ===============================
 
 @app.route('/api/classes/<int:class_id>/assessments', methods=['GET'])
+@conditional_get('assessments')
 def get_class_assessments(class_id):
     """Get all assessments for a class"""
     try:
@@ -373,9 +529,8 @@ def add_assessment(class_id):
     """Add an assessment to a class"""
     try:
         data = request.get_json()
-        required_fields = ['name', 'weight']
         
-        if not data or not all(field in data for field in required_fields):
+        if not has_fields(data, ASSESSMENT_FIELDS):
             return jsonify({'error': 'Missing required fields (name, weight)'}), 400
         
         assessment_id = db.add_assessment(
@@ -389,6 +544,8 @@ def add_assessment(class_id):
         return jsonify({'message': 'Assessment added successfully', 'id': assessment_id})
     except Exception as e:
         app.logger.error(f"Error adding assessment: {e}")
+        if is_missing_parent_error(e):
+            return jsonify({'error': 'Class not found'}), 404
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/assessments/<int:assessment_id>', methods=['PUT'])
@@ -422,6 +579,7 @@ def delete_assessment(assessment_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/assessments/<int:assessment_id>', methods=['GET'])
+@conditional_get('assessments')
 def get_assessment(assessment_id):
     """Get a single assessment by ID"""
     try:
@@ -443,11 +601,11 @@ def get_assessment(assessment_id):
 # ===============================
 
 @app.route('/api/students/<int:enrollment_id>/grades', methods=['GET'])
+@conditional_get('class_enrollments', 'classes', 'assessments', 'student_grades')
 def get_student_grades(enrollment_id):
     """Get all grades for a student in a class"""
     try:
-        grades = db.get_student_grades(enrollment_id)
-        grade_calc = db.calculate_student_grade(enrollment_id)
+        grades, grade_calc = db.get_student_grades_with_calc(enrollment_id)
         
         # Extract class information from grades (all grades will have the same class info)
         class_info = None
@@ -473,7 +631,7 @@ def update_student_grade(enrollment_id, assessment_id):
     """Update a student's grade for an assessment"""
     try:
         data = request.get_json()
-        if not data or 'score' not in data:
+        if not has_fields(data, GRADE_FIELDS):
             return jsonify({'error': 'Score is required'}), 400
         
         score = clamp(data.get('score'), 0, 100)
@@ -485,6 +643,8 @@ def update_student_grade(enrollment_id, assessment_id):
             return jsonify({'error': 'Failed to update grade'}), 500
     except Exception as e:
         app.logger.error(f"Error updating grade: {e}")
+        if is_missing_parent_error(e):
+            return jsonify({'error': 'Student enrollment or assessment not found'}), 404
         return jsonify({'error': str(e)}), 500
 
 # ===============================
@@ -505,11 +665,34 @@ def import_students_to_class(class_id):
         if not file.filename.endswith('.csv'):
             return jsonify({'error': 'Only CSV files are supported'}), 400
         
+        # Enrollments reference the class, so an import into a missing class can't succeed
+        if not db.get_class(class_id):
+            return jsonify({'error': 'Class not found'}), 404
+        
         # Check import mode from form data
         import_mode = request.form.get('import_mode', 'students-only')
         import_grades = (import_mode == 'students-and-grades')
         
         csv_content = file.read().decode('utf-8')
+        
+        # Run the import in the background; the client polls the job for the result
+        job_id = uuid4().hex
+        db.create_import_job(job_id, class_id)
+        IMPORT_EXECUTOR.submit(_run_import, job_id, csv_content, class_id, import_grades)
+        
+        return jsonify({
+            'job_id': job_id,
+            'state': 'pending',
+            'status_url': f'/api/imports/{job_id}'
+        }), 202
+    except Exception as e:
+        app.logger.error(f"Error importing students: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _run_import(job_id: str, csv_content: str, class_id: int, import_grades: bool) -> None:
+    """Import students for a background job and store the outcome on the job"""
+    try:
+        db.update_import_job(job_id, 'running')
         result = db.import_students_from_csv(csv_content, class_id, import_grades)
         
         # Enhanced success message
@@ -521,29 +704,45 @@ def import_students_to_class(class_id):
                 message += f" (with {len(result['errors'])} warnings)"
             result['message'] = message
         
-        return jsonify(result)
+        db.update_import_job(job_id, 'done', result)
     except Exception as e:
         app.logger.error(f"Error importing students: {e}")
+        try:
+            db.update_import_job(job_id, 'failed', {'error': str(e)})
+        except Exception as update_error:
+            # Nothing else would see this in the executor thread; the job expires as unfinished
+            app.logger.error(f"Error marking import job {job_id} as failed: {update_error}")
+
+@app.route('/api/imports/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """Get the state of a background import job, with its result once finished"""
+    try:
+        job = db.get_import_job(job_id)
+        if not job:
+            return jsonify({'error': 'Import job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        app.logger.error(f"Error getting import job: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/classes/<int:class_id>/export', methods=['GET'])
 def export_class_data(class_id):
     """Export class data to CSV"""
     try:
-        csv_content = db.export_class_data(class_id)
-        
-        if not csv_content:
+        # Class name and subject for the filename come back with the rows
+        export = db.export_class_data_with_meta(class_id)
+        if not export:
             return jsonify({'error': 'Class not found or no data'}), 404
         
-        # Get class info for filename
-        class_info = db.get_class(class_id)
-        filename = f"{class_info['class_name']}_{class_info['subject']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        rows, class_name, subject = export
+        filename = f"{class_name}_{subject}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-        
-        return response
+        # Stream rows to the client as they are generated
+        return Response(
+            stream_with_context(rows),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
     except Exception as e:
         app.logger.error(f"Error exporting class data: {e}")
         return jsonify({'error': str(e)}), 500
@@ -553,6 +752,7 @@ def export_class_data(class_id):
 # ===============================
 
 @app.route('/api/classes/<int:class_id>/analytics', methods=['GET'])
+@conditional_get(*db.VERSIONED_TABLES)
 def get_class_analytics(class_id):
     """Get comprehensive analytics for a class"""
     try:
@@ -561,11 +761,14 @@ def get_class_analytics(class_id):
         
         # Get students with grades for detailed analysis
         students = db.get_class_students(class_id)
+        grades_with_calcs = db.get_all_grades_with_calc_for_class(class_id)
         student_data = []
         
         for student in students:
-            grade_calc = db.calculate_student_grade(student['enrollment_id'])
-            grades = db.get_student_grades(student['enrollment_id'])
+            grades, grade_calc = grades_with_calcs.get(student['enrollment_id']) or (
+                db.get_student_grades(student['enrollment_id']),
+                db.calculate_student_grade(student['enrollment_id'])
+            )
             
             student_info = {
                 'student_id': student['student_id'],
@@ -591,6 +794,25 @@ def get_class_analytics(class_id):
 # PREDICTION API
 # ===============================
 
+def _prediction_payload(current: Dict[str, Any], best_case: float, worst_case: float,
+                        required_avg: float) -> Dict[str, Any]:
+    """Build the fixed-shape body shared by the single and class-wide predict routes"""
+    predicted = current['predicted']
+    return {
+        'current': {
+            'predicted': predicted,
+            'letter_grade': to_letter_grade(predicted),
+            'weighted_score': current['weighted_score'],
+            'completed_weight': current['completed_weight']
+        },
+        'scenarios': {
+            'best_case': round(best_case, 2),
+            'worst_case': round(worst_case, 2),
+            'required_average': round(required_avg, 2)
+        },
+        'remaining_weight': current['remaining_weight']
+    }
+
 @app.route('/api/students/<int:enrollment_id>/predict', methods=['POST'])
 def predict_grade(enrollment_id):
     """Predict final grade with different scenarios"""
@@ -619,25 +841,59 @@ def predict_grade(enrollment_id):
             # No remaining assessments
             best_case = worst_case = required_avg = current['predicted']
         
-        return jsonify({
-            'current': {
-                'predicted': current['predicted'],
-                'letter_grade': to_letter_grade(current['predicted']),
-                'weighted_score': current['weighted_score'],
-                'completed_weight': current['completed_weight']
-            },
-            'scenarios': {
-                'best_case': round(best_case, 2),
-                'worst_case': round(worst_case, 2),
-                'required_average': round(required_avg, 2)
-            },
-            'remaining_weight': remaining_weight,
-        })
+        payload = _prediction_payload(current, best_case, worst_case, required_avg)
+        return Response(orjson.dumps(payload), mimetype='application/json')
         
     except Exception as e:
         app.logger.error(f"Error predicting grade: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/classes/<int:class_id>/predict', methods=['POST'])
+def predict_class_grades(class_id):
+    """Predict final grade scenarios for every student in a class at once"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            target_grade = float(data.get('target_grade', 70))  # Default target is 70%
+        except (TypeError, ValueError):
+            target_grade = math.nan
+        if not math.isfinite(target_grade):
+            return jsonify({'error': 'target_grade must be a number'}), 400
+        
+        if not db.get_class(class_id):
+            return jsonify({'error': 'Class not found'}), 404
+        
+        grade_calcs = db.calculate_grades_for_class(class_id)
+        enrollment_ids = list(grade_calcs)
+        calcs = [grade_calcs[eid] for eid in enrollment_ids]
+        
+        weighted = np.array([c['weighted_score'] for c in calcs], dtype=np.float64)
+        total = np.array([c['total_weight'] for c in calcs], dtype=np.float64)
+        remaining = np.array([c['remaining_weight'] for c in calcs], dtype=np.float64)
+        predicted = np.array([c['predicted'] for c in calcs], dtype=np.float64)
+        
+        # Same formulas as predict_grade, evaluated for the whole class in one pass
+        has_remaining = remaining > 0
+        safe_total = np.where(has_remaining, total, 1.0)
+        safe_remaining = np.where(has_remaining, remaining, 1.0)
+        best_case = np.where(has_remaining, (weighted + remaining) / safe_total * 100, predicted)
+        worst_case = np.where(has_remaining, weighted / safe_total * 100, predicted)
+        required_avg = np.clip(((target_grade / 100 * total) - weighted) / safe_remaining * 100, 0, 100)
+        required_avg = np.where(has_remaining, required_avg, predicted)
+        
+        students = [
+            {'enrollment_id': eid, **_prediction_payload(calc, best, worst, required)}
+            for eid, calc, best, worst, required in zip(
+                enrollment_ids, calcs, best_case.tolist(), worst_case.tolist(), required_avg.tolist()
+            )
+        ]
+        
+        return jsonify({'target_grade': target_grade, 'students': students})
+    
+    except Exception as e:
+        app.logger.error(f"Error predicting class grades: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/students/<int:enrollment_id>/predict-assessment/<int:assessment_id>', methods=['POST'])
 def predict_assessment_score(enrollment_id, assessment_id):
     """
@@ -657,20 +913,10 @@ def predict_assessment_score(enrollment_id, assessment_id):
         data = request.get_json() or {}
         algorithm_mode = data.get('algorithm_mode', 'ensemble')  # Default to ensemble
         
-        # Use the advanced prediction system with algorithm choice
-        prediction_result = db.predict_missing_assessment_score(enrollment_id, assessment_id, algorithm_mode)
-        
-        # Get assessment details for context
-        with db.get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT a.name, a.weight, a.description, c.class_name, c.subject
-                FROM assessments a
-                JOIN classes c ON a.class_id = c.id
-                WHERE a.id = ?
-            ''', (assessment_id,))
-            
-            assessment_info = cursor.fetchone()
+        # Use the advanced prediction system with algorithm choice; assessment details come back with it
+        prediction_result, assessment_info = db.predict_missing_assessment_score(
+            enrollment_id, assessment_id, algorithm_mode, include_context=True
+        )
         
         if not assessment_info:
             return jsonify({'error': 'Assessment not found'}), 404
@@ -679,21 +925,13 @@ def predict_assessment_score(enrollment_id, assessment_id):
         response = {
             'assessment': {
                 'id': assessment_id,
-                'name': assessment_info[0],
-                'weight': assessment_info[1],
-                'description': assessment_info[2],
-                'class_name': assessment_info[3],
-                'subject': assessment_info[4]
-            },
-            'ai_prediction': {
-                'predicted_score': prediction_result['predicted_score'],
-                'confidence_level': prediction_result['confidence'],
-                'prediction_range': {
-                    'minimum': prediction_result['prediction_range']['min'],
-                    'maximum': prediction_result['prediction_range']['max']
-                },
-                'confidence_description': _get_confidence_description(prediction_result['confidence'])
+                'name': assessment_info['name'],
+                'weight': assessment_info['weight'],
+                'description': assessment_info['description'],
+                'class_name': assessment_info['class_name'],
+                'subject': assessment_info['subject']
             },
+            'ai_prediction': _ai_prediction_payload(prediction_result),
             'analysis': {
                 'contributing_factors': prediction_result['contributing_factors'],
                 'algorithm_breakdown': prediction_result['algorithm_breakdown']
@@ -715,195 +953,283 @@ def predict_assessment_score(enrollment_id, assessment_id):
             'fallback_advice': 'Try using the basic prediction endpoint or contact administrator'
         }), 500
 
-def _get_confidence_description(confidence: float) -> str:
-    """Convert confidence score to human-readable description"""
-    if confidence >= 0.8:
+@app.route('/api/assessments/<int:assessment_id>/predict', methods=['POST'])
+def predict_assessment_scores_for_class(assessment_id):
+    """Predict every enrolled student's score on an assessment at once"""
+    try:
+        data = request.get_json(silent=True) or {}
+        algorithm_mode = data.get('algorithm_mode', 'ensemble')  # Default to ensemble
+        
+        # Class grades are read and analyzed once for all students
+        predictions, assessment_info = db.predict_assessment_scores_for_class(assessment_id, algorithm_mode)
+        
+        if not assessment_info:
+            return jsonify({'error': 'Assessment not found'}), 404
+        
+        students = [
+            {
+                'enrollment_id': enrollment_id,
+                'ai_prediction': _ai_prediction_payload(prediction_result),
+                'recommendation': _generate_recommendation(prediction_result)
+            }
+            for enrollment_id, prediction_result in predictions.items()
+        ]
+        
+        return jsonify({
+            'assessment': {
+                'id': assessment_id,
+                'name': assessment_info['name'],
+                'weight': assessment_info['weight'],
+                'description': assessment_info['description'],
+                'class_name': assessment_info['class_name'],
+                'subject': assessment_info['subject']
+            },
+            'algorithm_mode': algorithm_mode,
+            'students': students
+        })
+    
+    except Exception as e:
+        app.logger.error(f"Error predicting class scores for assessment {assessment_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _ai_prediction_payload(prediction_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the ai_prediction block shared by the single and class-wide assessment predict routes"""
+    return {
+        'predicted_score': prediction_result['predicted_score'],
+        'confidence_level': prediction_result['confidence'],
+        'prediction_range': {
+            'minimum': prediction_result['prediction_range']['min'],
+            'maximum': prediction_result['prediction_range']['max']
+        },
+        'confidence_description': _get_confidence_description(prediction_result['confidence'])
+    }
+
+@lru_cache(maxsize=128)
+def _confidence_description_for_bin(confidence_bin: int) -> str:
+    """Description for a confidence bin (0 = lowest, 4 = highest)"""
+    if confidence_bin >= 4:
         return "Very High - Prediction based on strong historical patterns"
-    elif confidence >= 0.6:
+    elif confidence_bin == 3:
         return "High - Good amount of data supports this prediction"
-    elif confidence >= 0.4:
+    elif confidence_bin == 2:
         return "Moderate - Some uncertainty due to limited data"
-    elif confidence >= 0.2:
+    elif confidence_bin == 1:
         return "Low - Prediction has significant uncertainty"
     else:
         return "Very Low - Use with caution, insufficient data"
 
-def _generate_recommendation(prediction_result: dict) -> str:
-    """Generate actionable recommendation based on prediction"""
-    score = prediction_result['predicted_score']
-    confidence = prediction_result['confidence']
-    
-    if score >= 90:
+def _get_confidence_description(confidence: float) -> str:
+    """Convert confidence score to human-readable description"""
+    # NaN fails every threshold, so it gets the lowest description
+    if math.isnan(confidence):
+        return _confidence_description_for_bin(0)
+    # Bins of width 0.2 line up with the description thresholds; clamping first keeps
+    # infinite or huge values out of int()
+    return _confidence_description_for_bin(min(4, int(min(max(confidence, 0.0), 1.0) * 5)))
+
+@lru_cache(maxsize=128)
+def _recommendation_for_bin(score_bin: int, confident: bool) -> str:
+    """Recommendation for a score decile (5 = below 60, 9 = 90 and above)"""
+    if score_bin >= 9:
         return "Student is predicted to excel. Consider offering advanced challenges."
-    elif score >= 80:
+    elif score_bin == 8:
         return "Student is on track for strong performance. Maintain current approach."
-    elif score >= 70:
+    elif score_bin == 7:
         return "Student should achieve satisfactory results with continued effort."
-    elif score >= 60:
+    elif score_bin == 6:
         return "Student may struggle. Consider additional support or review sessions."
     else:
-        if confidence > 0.5:
+        if confident:
             return "Strong intervention recommended. Student likely needs significant help."
         else:
             return "Prediction uncertain. Monitor closely and provide support as needed."
 
+def _generate_recommendation(prediction_result: dict) -> str:
+    """Generate actionable recommendation based on prediction"""
+    score = prediction_result['predicted_score']
+    confidence = prediction_result['confidence']
+    
+    # NaN fails every threshold, so it gets the below-60 recommendation
+    if math.isnan(score):
+        return _recommendation_for_bin(5, confidence > 0.5)
+    return _recommendation_for_bin(max(5, min(9, int(min(max(score, 0.0), 100.0) // 10))), confidence > 0.5)
+
 # ===============================
 # LEGACY TEMPLATE API (for compatibility)
 # ===============================
 
+ASSESSMENT_TEMPLATES = {
+    "Mathematics": [
+        {"name": "Assignment 1", "weight": 20},
+        {"name": "Quiz 1", "weight": 10},
+        {"name": "Project", "weight": 20},
+        {"name": "Final Exam", "weight": 50},
+    ],
+    "English": [
+        {"name": "Portfolio", "weight": 30},
+        {"name": "Speaking", "weight": 20},
+        {"name": "Essay", "weight": 30},
+        {"name": "Exam", "weight": 20},
+    ],
+    "Investigating Science": [
+        {"name": "Prac Report", "weight": 25},
+        {"name": "Research Task", "weight": 25},
+        {"name": "In-class Task", "weight": 20},
+        {"name": "Exam", "weight": 30},
+    ],
+}
+
+# The templates never change, so serialize them once at startup
+ASSESSMENT_TEMPLATES_JSON = orjson.dumps(ASSESSMENT_TEMPLATES)
+ASSESSMENT_TEMPLATES_GZIP = gzip.compress(ASSESSMENT_TEMPLATES_JSON, 6)
+TEMPLATE_JSON_BY_NAME = {
+    name: orjson.dumps({'name': name, 'assessments': assessments})
+    for name, assessments in ASSESSMENT_TEMPLATES.items()
+}
+
 @app.route('/api/templates', methods=['GET'])
 def get_templates():
     """Get assessment templates"""
-    templates = {
-        "Mathematics": [
-            {"name": "Assignment 1", "weight": 20},
-            {"name": "Quiz 1", "weight": 10},
-            {"name": "Project", "weight": 20},
-            {"name": "Final Exam", "weight": 50},
-        ],
-        "English": [
-            {"name": "Portfolio", "weight": 30},
-            {"name": "Speaking", "weight": 20},
-            {"name": "Essay", "weight": 30},
-            {"name": "Exam", "weight": 20},
-        ],
-        "Investigating Science": [
-            {"name": "Prac Report", "weight": 25},
-            {"name": "Research Task", "weight": 25},
-            {"name": "In-class Task", "weight": 20},
-            {"name": "Exam", "weight": 30},
-        ],
-    }
-    return jsonify(templates)
+    return _precompressed_response(ASSESSMENT_TEMPLATES_JSON, ASSESSMENT_TEMPLATES_GZIP, 'application/json')
+
+# Only known template names match, so routing answers unknown ones with a 404 itself
+TEMPLATE_NAME_CONVERTER = 'any({}):template_name'.format(', '.join(f'"{name}"' for name in ASSESSMENT_TEMPLATES))
 
-@app.route('/api/templates/<template_name>', methods=['GET'])
+@app.route(f'/api/templates/<{TEMPLATE_NAME_CONVERTER}>', methods=['GET'])
 def get_template(template_name):
     """Get specific template"""
-    templates = {
-        "Mathematics": [
-            {"name": "Assignment 1", "weight": 20},
-            {"name": "Quiz 1", "weight": 10},
-            {"name": "Project", "weight": 20},
-            {"name": "Final Exam", "weight": 50},
-        ],
-        "English": [
-            {"name": "Portfolio", "weight": 30},
-            {"name": "Speaking", "weight": 20},
-            {"name": "Essay", "weight": 30},
-            {"name": "Exam", "weight": 20},
-        ],
-        "Investigating Science": [
-            {"name": "Prac Report", "weight": 25},
-            {"name": "Research Task", "weight": 25},
-            {"name": "In-class Task", "weight": 20},
-            {"name": "Exam", "weight": 30},
-        ],
-    }
-    
-    if template_name not in templates:
-        return jsonify({'error': 'Template not found'}), 404
-    
-    return jsonify({
-        'name': template_name,
-        'assessments': templates[template_name]
-    })
+    return Response(TEMPLATE_JSON_BY_NAME[template_name], mimetype='application/json')
 
 # ===============================
 # CSV TEMPLATE HELPERS
 # ===============================
 
+class EchoWriter:
+    """File-like object whose write() hands the formatted CSV line straight back"""
+    
+    def write(self, value: str) -> str:
+        return value
+
+# Sample rows for the student import template
+STUDENT_CSV_TEMPLATE_ROWS = [
+    ['student_id', 'first_name', 'last_name', 'email'],
+    ['STU001', 'John', 'Smith', 'john.smith@school.edu'],
+    ['STU002', 'Jane', 'Doe', 'jane.doe@school.edu'],
+    ['STU003', 'Mike', 'Johnson', 'mike.johnson@school.edu'],
+    ['STU004', 'Sarah', 'Wilson', 'sarah.wilson@school.edu'],
+    ['STU005', 'David', 'Brown', 'david.brown@school.edu'],
+]
+
+# The template is static, so format and encode it once at startup
+_template_writer = csv.writer(EchoWriter())
+STUDENT_CSV_TEMPLATE = ''.join(_template_writer.writerow(row) for row in STUDENT_CSV_TEMPLATE_ROWS).encode('utf-8')
+
 @app.route('/api/templates/student-csv', methods=['GET'])
 def download_student_csv_template():
-    """Generate and download a sample CSV template for student import"""
-    try:
-        # Sample CSV data
-        csv_data = [
-            ['student_id', 'first_name', 'last_name', 'email'],
-            ['STU001', 'John', 'Smith', 'john.smith@school.edu'],
-            ['STU002', 'Jane', 'Doe', 'jane.doe@school.edu'],
-            ['STU003', 'Mike', 'Johnson', 'mike.johnson@school.edu'],
-            ['STU004', 'Sarah', 'Wilson', 'sarah.wilson@school.edu'],
-            ['STU005', 'David', 'Brown', 'david.brown@school.edu'],
-        ]
-        
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        for row in csv_data:
-            writer.writerow(row)
-        
-        csv_content = output.getvalue()
-        output.close()
-        
-        # Create response
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = 'attachment; filename=student_import_template.csv'
-        
-        return response
-        
-    except Exception as e:
-        app.logger.error(f"Error generating CSV template: {e}")
-        return jsonify({'error': str(e)}), 500
+    """Download a sample CSV template for student import"""
+    return Response(
+        STUDENT_CSV_TEMPLATE,
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=student_import_template.csv'}
+    )
+
+IMPORT_INFO = {
+    'format': {
+        'required_columns': ['student_id', 'first_name', 'last_name'],
+        'optional_columns': ['email'],
+        'column_order': ['student_id', 'first_name', 'last_name', 'email'],
+        'encoding': 'UTF-8',
+        'file_type': 'CSV'
+    },
+    'requirements': [
+        'First row must contain column headers',
+        'student_id must be unique',
+        'first_name and last_name are required',
+        'email is optional but must be valid if provided',
+        'File must be saved in UTF-8 encoding'
+    ],
+    'examples': [
+        {
+            'student_id': 'STU001',
+            'first_name': 'John',
+            'last_name': 'Smith',
+            'email': 'john.smith@school.edu'
+        },
+        {
+            'student_id': 'STU002',
+            'first_name': 'Jane',
+            'last_name': 'Doe',
+            'email': 'jane.doe@school.edu'
+        }
+    ]
+}
+IMPORT_INFO_JSON = orjson.dumps(IMPORT_INFO)
+IMPORT_INFO_GZIP = gzip.compress(IMPORT_INFO_JSON, 6)
 
 @app.route('/api/import/info', methods=['GET'])
 def get_import_info():
     """Get information about CSV import format and requirements"""
-    return jsonify({
-        'format': {
-            'required_columns': ['student_id', 'first_name', 'last_name'],
-            'optional_columns': ['email'],
-            'column_order': ['student_id', 'first_name', 'last_name', 'email'],
-            'encoding': 'UTF-8',
-            'file_type': 'CSV'
-        },
-        'requirements': [
-            'First row must contain column headers',
-            'student_id must be unique',
-            'first_name and last_name are required',
-            'email is optional but must be valid if provided',
-            'File must be saved in UTF-8 encoding'
-        ],
-        'examples': [
-            {
-                'student_id': 'STU001',
-                'first_name': 'John',
-                'last_name': 'Smith',
-                'email': 'john.smith@school.edu'
-            },
-            {
-                'student_id': 'STU002',
-                'first_name': 'Jane',
-                'last_name': 'Doe',
-                'email': 'jane.doe@school.edu'
-            }
-        ]
-    })
+    response = _precompressed_response(IMPORT_INFO_JSON, IMPORT_INFO_GZIP, 'application/json')
+    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return response
 
 # ===============================
 # HEALTH CHECK
 # ===============================
 
+# Only the timestamp changes between health checks
+HEALTH_PREFIX = b'{"status":"healthy","version":"2.0.0","timestamp":"'
+
+# (whole second, encoded timestamp) of the last health check; replaced as one tuple so threads never see half an update
+_health_timestamp = (0, b'')
+
+def _health_timestamp_bytes() -> bytes:
+    """Local ISO timestamp to the second, formatted at most once per second"""
+    global _health_timestamp
+    now = int(time.time())
+    cached_second, cached_bytes = _health_timestamp
+    if now != cached_second:
+        cached_bytes = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(now)).encode()
+        _health_timestamp = (now, cached_bytes)
+    return cached_bytes
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'version': '2.0.0'
-    })
+    body = HEALTH_PREFIX + _health_timestamp_bytes() + b'"}'
+    return Response(body, mimetype='application/json')
+
+# Endpoints whose responses are built from precomputed bytes, keyed by path
+STATIC_ROUTES = {
+    '/api/health': health_check,
+    '/api/templates': get_templates,
+    '/api/templates/student-csv': download_student_csv_template,
+    '/api/import/info': get_import_info,
+}
+
+@app.before_request
+def serve_static_routes():
+    """Answer the precomputed endpoints directly, before view dispatch"""
+    if request.method == 'GET':
+        view = STATIC_ROUTES.get(request.path)
+        if view is not None:
+            return view()
 
 # ===============================
 # ERROR HANDLERS
 # ===============================
 
+# Error bodies never change, so encode them once
+NOT_FOUND_JSON = orjson.dumps({'error': 'Endpoint not found'})
+INTERNAL_ERROR_JSON = orjson.dumps({'error': 'Internal server error'})
+
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return Response(NOT_FOUND_JSON, status=404, mimetype='application/json')
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({'error': 'Internal server error'}), 500
+    return Response(INTERNAL_ERROR_JSON, status=500, mimetype='application/json')
 
 # ===============================
 # DEVELOPMENT HELPERS
@@ -922,84 +1248,75 @@ def init_db():
 def seed_data():
     """Seed database with comprehensive sample data from class_marks_data.csv"""
     try:
-        import random
-        import csv
-        import os
-        
         # Check if sample data already exists
-        teachers = db.get_all_teachers()
         sample_emails = ['sarah.johnson@school.edu']
-        if any(t['email'] in sample_emails for t in teachers):
+        existing_sample_teachers = db.count_teachers_by_email(sample_emails)
+        if existing_sample_teachers:
             return jsonify({
                 'message': 'Sample data already exists! You can see teachers, classes, and students in the interface.',
-                'teachers': len([t for t in teachers if t['email'] in sample_emails]),
+                'teachers': existing_sample_teachers,
                 'status': 'already_exists'
             })
         
-        # Add sample teacher
-        teacher_id = db.add_teacher('Dr. Sarah Johnson', 'sarah.johnson@school.edu')
-        
-        # Add sample class
-        class_id = db.add_class(teacher_id, 'Mathematics 101', 'Mathematics', '2024', 'Semester 1')
-        
-        # Load data from CSV file
-        csv_file_path = os.path.join(os.path.dirname(__file__), 'class_marks_data.csv')
-        
-        if not os.path.exists(csv_file_path):
-            return jsonify({'error': 'class_marks_data.csv not found'}), 400
-        
-        students_added = 0
-        assessments_created = False
-        
-        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
+        # Write all sample data in one transaction so it is committed once
+        with db.transaction():
+            # Add sample teacher
+            teacher_id = db.add_teacher('Dr. Sarah Johnson', 'sarah.johnson@school.edu')
             
-            # Get assessment columns (excluding student info columns)
-            assessment_columns = [col for col in reader.fieldnames 
-                                if col not in ['student_id', 'first_name', 'last_name', 'email']]
+            # Add sample class
+            class_id = db.add_class(teacher_id, 'Mathematics 101', 'Mathematics', '2024', 'Semester 1')
             
-            for row in reader:
-                # Add student
-                student_id = row['student_id']
-                first_name = row['first_name']
-                last_name = row['last_name']
-                email = row['email']
-                
-                db.add_student(student_id, first_name, last_name, email)
-                enrollment_id = db.enroll_student_in_class(class_id, student_id)
-                students_added += 1
+            # Load data from CSV file
+            csv_file_path = os.path.join(os.path.dirname(__file__), 'class_marks_data.csv')
+            
+            if not os.path.exists(csv_file_path):
+                return jsonify({'error': 'class_marks_data.csv not found'}), 400
+            
+            with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile)
                 
-                # Create assessments (only once)
-                if not assessments_created:
-                    assessment_weights = {
-                        'Quiz_1': 10, 'Assignment_1': 15, 'Midterm_Exam': 20,
-                        'Quiz_2': 10, 'Assignment_2': 15, 'Project_Presentation': 15,
-                        'Quiz_3': 10, 'Final_Exam': 25
-                    }
-                    
-                    for assessment_name in assessment_columns:
-                        weight = assessment_weights.get(assessment_name, 10)
-                        assessment_type = 'Quiz' if 'Quiz' in assessment_name else \
-                                        'Assignment' if 'Assignment' in assessment_name else \
-                                        'Exam' if 'Exam' in assessment_name else \
-                                        'Project' if 'Project' in assessment_name else 'Other'
-                        
-                        db.add_assessment(class_id, assessment_name, weight, 
-                                        '2024-12-01', f'{assessment_name} for Mathematics 101')
-                    
-                    assessments_created = True
+                # Get assessment columns (excluding student info columns)
+                assessment_columns = [col for col in reader.fieldnames 
+                                    if col not in ['student_id', 'first_name', 'last_name', 'email']]
+                rows = list(reader)
+            
+            students_added = len(rows)
+            
+            # Add and enroll every student in one batch each
+            db.add_students_bulk([
+                (row['student_id'], row['first_name'], row['last_name'], row['email'])
+                for row in rows
+            ])
+            enrollment_ids = db.enroll_students_bulk(class_id, [row['student_id'] for row in rows])
+            
+            # Create assessments (only when there are students to grade)
+            if rows:
+                assessment_weights = {
+                    'Quiz_1': 10, 'Assignment_1': 15, 'Midterm_Exam': 20,
+                    'Quiz_2': 10, 'Assignment_2': 15, 'Project_Presentation': 15,
+                    'Quiz_3': 10, 'Final_Exam': 25
+                }
                 
-                # Add grades for this student
-                assessments = db.get_class_assessments(class_id)
+                db.add_assessments_bulk(class_id, [
+                    (assessment_name, assessment_weights.get(assessment_name, 10),
+                     '2024-12-01', f'{assessment_name} for Mathematics 101')
+                    for assessment_name in assessment_columns
+                ])
+            
+            # Collect every student's grades and write them together
+            assessments = db.get_class_assessments(class_id)
+            grades = []
+            for row in rows:
+                enrollment_id = enrollment_ids[row['student_id']]
                 for assessment in assessments:
                     assessment_name = assessment['name']
                     if assessment_name in row and row[assessment_name] and row[assessment_name].strip():
                         try:
-                            score = float(row[assessment_name])
-                            db.update_student_grade(enrollment_id, assessment['id'], score)
+                            grades.append((enrollment_id, assessment['id'], float(row[assessment_name])))
                         except (ValueError, TypeError):
                             # Skip invalid scores (empty cells, etc.)
                             pass
+            db.update_student_grades_bulk(grades)
         
         # Count created items
         teacher_count = 1
@@ -1021,9 +1338,11 @@ if __name__ == '__main__':
     # Initialize database
     db.init_database()
     
-    # Run the application
+    # Development server only; in production run `gunicorn -c gunicorn.conf.py app:app`.
+    # The debugger and reloader are opt-in via FLASK_DEBUG=1.
     app.run(
-        debug=True,
+        debug=os.environ.get('FLASK_DEBUG') == '1',
         host='0.0.0.0',
-        port=5000
+        port=5000,
+        threaded=True
     )
\ No newline at end of file
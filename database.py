@@ -5,38 +5,299 @@ Handles teachers, classes, students, and grade tracking
 """
 
 import sqlite3
+import atexit
+import logging
+import os
+import copy
+import re
 import json
+import threading
+import weakref
 import csv
 import io
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Union, TextIO
 from contextlib import contextmanager
+from functools import lru_cache, partial
+from itertools import groupby, islice
+from operator import itemgetter
 
 # Scikit-learn imports for regression models (as required by assessment)
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import StandardScaler, PolynomialFeatures
-from sklearn.pipeline import Pipeline
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+def _close_connection(conn: sqlite3.Connection) -> None:
+    """Close a connection, ignoring errors from one that is already unusable"""
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+# One reusable CSV line buffer per thread for streamed exports
+_csv_buffers = threading.local()
+
+def _thread_csv_buffer() -> io.StringIO:
+    """Get this thread's CSV line buffer, creating it on first use"""
+    buffer = getattr(_csv_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _csv_buffers.buffer = io.StringIO()
+    return buffer
+
+# Grade upsert shared by single and bulk grade writes, so both reuse one cached statement
+_GRADE_UPSERT_SQL = '''
+    INSERT INTO student_grades (enrollment_id, assessment_id, score)
+    VALUES (?, ?, ?)
+    ON CONFLICT(enrollment_id, assessment_id) DO UPDATE SET
+        score = excluded.score,
+        graded_at = CURRENT_TIMESTAMP
+'''
+
+# Assessment columns update_assessment may change
+_ASSESSMENT_UPDATE_FIELDS = frozenset(('name', 'weight', 'due_date', 'description'))
+
+@lru_cache(maxsize=None)
+def _assessment_update_sql(fields: Tuple[str, ...]) -> str:
+    """UPDATE statement for a given set of assessment columns, built once per distinct set"""
+    assignments = ', '.join(f"{field} = ?" for field in fields)
+    return f'UPDATE assessments SET {assignments} WHERE id = ?'
+
+# Assessment types and the name keywords that identify them, checked in this priority order
+_ASSESSMENT_TYPE_KEYWORDS = (
+    ('quiz', ('quiz',)),
+    ('exam', ('exam', 'test')),
+    ('project', ('project', 'assignment')),
+    ('homework', ('homework', 'hw')),
+    ('lab', ('lab',)),
+    ('presentation', ('presentation',))
+)
+
+@lru_cache(maxsize=1024)
+def _assessment_type_for_name(name: str) -> str:
+    """Assessment type for a name, classified once per distinct name"""
+    name_lower = name.lower()
+    for assessment_type, keywords in _ASSESSMENT_TYPE_KEYWORDS:
+        if any(keyword in name_lower for keyword in keywords):
+            return assessment_type
+    return 'other'
+
+def _chunked(iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of at most size items from iterable"""
+    iterator = iter(iterable)
+    return iter(lambda: list(islice(iterator, size)), [])
+
+@lru_cache(maxsize=None)
+def _polynomial_features(degree: int) -> PolynomialFeatures:
+    """Fitted PolynomialFeatures for a single time column, shared by every regression of that degree"""
+    return PolynomialFeatures(degree=degree).fit(np.zeros((1, 1)))
+
+def _prediction_range(prediction: float, below: float, above: float) -> Dict[str, float]:
+    """Range from prediction - below to prediction + above, clamped to 0-100"""
+    low = prediction - below
+    high = prediction + above
+    # Same results as max(0, low) / min(100, high), without the two builtin calls
+    return {'min': low if low > 0 else 0, 'max': high if high < 100 else 100}
+
 class DatabaseManager:
     """SQLite database manager for grade predictor with class system"""
     
+    # Applied once to every new connection (journal_mode is skipped for in-memory databases)
+    CONNECTION_PRAGMAS = (
+        'PRAGMA journal_mode=WAL',  # Readers no longer block on writers
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA temp_store=MEMORY',
+        'PRAGMA mmap_size=268435456',
+        'PRAGMA cache_size=-65536',
+        'PRAGMA busy_timeout=5000',  # Wait for a competing writer instead of failing with "database is locked"
+        'PRAGMA foreign_keys=ON'  # Enforce references and let ON DELETE CASCADE remove dependent rows
+    )
+    
+    # Prepared statements kept per connection, with headroom over the default 128 for dynamic UPDATEs
+    CACHED_STATEMENTS = 256
+    
+    # Upserts (INSERT ... ON CONFLICT) need SQLite 3.24; INSERT ... RETURNING, used where
+    # it saves a second query, needs 3.35 and is skipped on older versions
+    MIN_SQLITE_VERSION = (3, 24, 0)
+    HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+    
+    # Rows handed to each executemany call by the bulk writers
+    BULK_BATCH_SIZE = 1000
+    
+    # Bound parameters per IN (...) list; SQLite builds before 3.32 cap a statement at 999
+    MAX_IN_PARAMETERS = 900
+    
+    # Students written per chunk of a streamed CSV export
+    EXPORT_ROWS_PER_CHUNK = 100
+    
+    # Unfinished import jobs older than this were lost with the worker running them;
+    # finished jobs are kept this long for clients still polling
+    IMPORT_JOB_TIMEOUT_MINUTES = 15
+    IMPORT_JOB_RETENTION_DAYS = 7
+    
+    # Letter grades from highest to lowest, and the minimum predicted grade for D, C, B and A
+    LETTER_GRADES = ('A', 'B', 'C', 'D', 'E')
+    LETTER_GRADE_THRESHOLDS = np.array([60.0, 70.0, 80.0, 90.0])
+    
+    # Tables whose foreign keys cascade deletes from their parent rows
+    CASCADING_TABLES = ('classes', 'class_enrollments', 'assessments', 'student_grades', 'grade_history')
+    # Tables whose orphaned rows the migration removes without asking; none of them is reachable
+    ORPHAN_CLEANUP_TABLES = frozenset(('class_enrollments', 'assessments', 'student_grades', 'grade_history'))
+    
+    # Tables whose writes are tracked in data_versions
+    VERSIONED_TABLES = ('teachers', 'classes', 'students', 'class_enrollments', 'assessments', 'student_grades')
+    
+    # Class size the rank-based algorithms assume, and the score predicted when nothing better is known
+    ASSUMED_CLASS_SIZE = 25
+    DEFAULT_PREDICTED_SCORE = 75.0
+    
+    # Ensemble members in evaluation order (as reported in algorithm_breakdown) and their weights
+    ENSEMBLE_ALGORITHMS = ('linear_regression', 'polynomial_regression', 'trend_based', 'type_correlation',
+                           'difficulty_adjusted', 'class_comparative', 'rank_based')
+    ENSEMBLE_WEIGHTS = np.array([0.15, 0.15, 0.15, 0.15, 0.15, 0.1, 0.15])
+    
+    # Algorithms behind the single-algorithm modes, by the name reported in algorithm_breakdown:
+    # (method, whether it takes class patterns, confidence, range below, range above, factor)
+    SINGLE_MODE_ALGORITHMS = {
+        'sklearn_linear_regression': ('_sklearn_linear_regression_value', True, 0.65, 12, 12,
+                                      'Scikit-learn Linear Regression based on historical grade progression'),
+        'sklearn_polynomial_regression': ('_sklearn_polynomial_regression_value', True, 0.7, 10, 10,
+                                          'Scikit-learn Polynomial Regression capturing non-linear performance patterns'),
+        'rank_based': ('_rank_based_prediction', True, 0.7, 15, 15,
+                       'HSC-style rank-based prediction using individual assessment rankings'),
+        'trend_based': ('_trend_based_prediction', False, 0.6, 10, 10,
+                        'Linear trend analysis of student performance over time'),
+        'difficulty_adjusted': ('_difficulty_adjusted_prediction', False, 0.65, 12, 12,
+                                'Assessment difficulty adjustment based on class performance'),
+        'type_correlation': ('_type_correlation_prediction', False, 0.6, 12, 12,
+                             'Performance correlation with similar assessment types'),
+        'class_comparative': ('_class_comparative_prediction', True, 0.55, 15, 15,
+                              'Relative performance comparison with class average')
+    }
+    
+    # Tables a prediction reads, and how many (enrollment, assessment, mode, version) results to keep
+    PREDICTION_TABLES = ('classes', 'class_enrollments', 'assessments', 'student_grades')
+    PREDICTION_CACHE_SIZE = 4096
+    
+    # Tables a grade calculation reads, and how many (class, version) calculations to keep
+    GRADE_TABLES = ('class_enrollments', 'assessments', 'student_grades')
+    CLASS_GRADES_CACHE_SIZE = 256
+    
     def __init__(self, db_path: str = 'smartgrades.db'):
+        if sqlite3.sqlite_version_info < self.MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"SQLite {'.'.join(map(str, self.MIN_SQLITE_VERSION))} or newer is required "
+                f"(found {sqlite3.sqlite_version})"
+            )
         self.db_path = db_path
+        self._local = threading.local()  # Per-thread connection, borrow depth and transaction() state
+        self._connections = set()  # Open thread connections, so they can all be closed at exit
+        self._connections_lock = threading.RLock()  # Reentrant: a thread finalizer may run while it is held
+        atexit.register(self.close_connections)
+        self._cached_prediction = lru_cache(maxsize=self.PREDICTION_CACHE_SIZE)(self._predict_with_context)
+        self._cached_prediction_inputs = lru_cache(maxsize=self.PREDICTION_CACHE_SIZE)(self._prediction_inputs)
+        self._cached_class_grades = lru_cache(maxsize=self.CLASS_GRADES_CACHE_SIZE)(self._calculate_grades_for_class)
+        # Single-algorithm prediction modes; any other mode runs the full ensemble
+        self._mode_predictions = {
+            'linear_regression': partial(self._single_mode_prediction, 'sklearn_linear_regression'),
+            'polynomial_regression': partial(self._single_mode_prediction, 'sklearn_polynomial_regression'),
+            'single': self._single_algorithm_predictions,
+            'rank_only': partial(self._single_mode_prediction, 'rank_based'),
+            'trend_only': partial(self._single_mode_prediction, 'trend_based'),
+            'difficulty_only': partial(self._single_mode_prediction, 'difficulty_adjusted'),
+            'type_only': partial(self._single_mode_prediction, 'type_correlation'),
+            'comparative_only': partial(self._single_mode_prediction, 'class_comparative')
+        }
         self.init_database()
     
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a new connection (closable from any thread at shutdown)"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=self.CACHED_STATEMENTS)
+        conn.row_factory = sqlite3.Row  # Enable dict-like row access
+        for pragma in self.CONNECTION_PRAGMAS:
+            if self.db_path == ':memory:' and pragma.startswith('PRAGMA journal_mode'):
+                continue
+            conn.execute(pragma)
+        return conn
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        """Get this thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._create_connection()
+            with self._connections_lock:
+                self._connections.add(conn)
+            # Close it once the thread is gone; servers that start a thread per request
+            # would otherwise keep one open connection for every request served
+            weakref.finalize(threading.current_thread(), self._release_connection, conn)
+        return conn
+    
+    def _release_connection(self, conn: sqlite3.Connection) -> None:
+        """Stop tracking a finished thread's connection and close it"""
+        with self._connections_lock:
+            self._connections.discard(conn)
+        _close_connection(conn)
+    
+    def close_connections(self) -> None:
+        """Close every thread's connection (registered to run at interpreter exit)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            _close_connection(conn)
+    
     @contextmanager
     def get_db_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dict-like row access
+        """Context manager that lends out this thread's connection; nested calls share it"""
+        conn = self._thread_connection()
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
         try:
             yield conn
         finally:
-            conn.close()
+            self._local.depth = depth
+            # Discard anything the outermost caller left uncommitted, as closing used to
+            if depth == 0 and conn.in_transaction:
+                conn.rollback()
+    
+    @contextmanager
+    def transaction(self):
+        """Group every database call made by this thread into a single commit.
+        
+        Methods called inside the block skip their own commits; the whole
+        block is committed on success and rolled back if it raises.
+        """
+        if getattr(self._local, 'in_transaction_block', False):
+            # Nested transaction(): the outer block owns the commit
+            yield self._thread_connection()
+            return
+        
+        with self.get_db_connection() as conn:
+            if not conn.in_transaction:
+                # Take the write lock up front so a later write can't fail on a stale WAL snapshot
+                conn.execute('BEGIN IMMEDIATE')
+            self._local.in_transaction_block = True
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.in_transaction_block = False
+    
+    def _executemany_batched(self, cursor: sqlite3.Cursor, sql: str, rows) -> None:
+        """Run executemany over rows in BULK_BATCH_SIZE chunks to bound memory for large inputs"""
+        for chunk in _chunked(rows, self.BULK_BATCH_SIZE):
+            cursor.executemany(sql, chunk)
+    
+    def _commit(self, conn: sqlite3.Connection) -> None:
+        """Commit unless an enclosing transaction() owns the commit"""
+        if not getattr(self._local, 'in_transaction_block', False):
+            conn.commit()
     
     def init_database(self):
         """Initialize database with required tables"""
@@ -64,7 +325,7 @@ class DatabaseManager:
                     semester TEXT,
                     grading_scale TEXT DEFAULT 'letter',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (teacher_id) REFERENCES teachers (id)
+                    FOREIGN KEY (teacher_id) REFERENCES teachers (id) ON DELETE CASCADE
                 )
             ''')
             
@@ -87,8 +348,8 @@ class DatabaseManager:
                     class_id INTEGER NOT NULL,
                     student_id INTEGER NOT NULL,
                     enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (class_id) REFERENCES classes (id),
-                    FOREIGN KEY (student_id) REFERENCES students (id),
+                    FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE,
+                    FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE,
                     UNIQUE(class_id, student_id)
                 )
             ''')
@@ -103,23 +364,22 @@ class DatabaseManager:
                     due_date DATE,
                     description TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (class_id) REFERENCES classes (id)
+                    FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE
                 )
             ''')
             
             # Student grades
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS student_grades (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     enrollment_id INTEGER NOT NULL,
                     assessment_id INTEGER NOT NULL,
                     score REAL CHECK (score >= 0 AND score <= 100),
                     submitted_at TIMESTAMP,
                     graded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (enrollment_id) REFERENCES class_enrollments (id),
-                    FOREIGN KEY (assessment_id) REFERENCES assessments (id),
-                    UNIQUE(enrollment_id, assessment_id)
-                )
+                    FOREIGN KEY (enrollment_id) REFERENCES class_enrollments (id) ON DELETE CASCADE,
+                    FOREIGN KEY (assessment_id) REFERENCES assessments (id) ON DELETE CASCADE,
+                    PRIMARY KEY (enrollment_id, assessment_id)
+                ) WITHOUT ROWID
             ''')
             
             # Grade history for tracking changes
@@ -130,11 +390,262 @@ class DatabaseManager:
                     predicted_grade REAL NOT NULL,
                     weighted_score REAL NOT NULL,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (enrollment_id) REFERENCES class_enrollments (id)
+                    FOREIGN KEY (enrollment_id) REFERENCES class_enrollments (id) ON DELETE CASCADE
                 )
             ''')
             
+            self._migrate_cascading_foreign_keys(conn)
+            self._migrate_student_grades_without_rowid(conn)
+            
+            indexes_before = self._index_names(cursor)
+            
+            # Indexes for the foreign keys the grade queries join and filter on.
+            # student_grades(enrollment_id) and class_enrollments(class_id) are already
+            # covered by the leading columns of their primary key and UNIQUE constraint.
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_grades_assessment ON student_grades(assessment_id)')
+            # Assessments are always read in (due_date, created_at, id) order within a class
+            cursor.execute('DROP INDEX IF EXISTS idx_assessments_class')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_assessments_class_due ON assessments(class_id, due_date, created_at)'
+            )
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_classes_teacher ON classes(teacher_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_grade_history_enrollment ON grade_history(enrollment_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_enrollments_student ON class_enrollments(student_id)')
+            self._ensure_unique_student_ids(conn)
+            
+            # Background CSV import jobs, shared by all server processes
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS import_jobs (
+                    id TEXT PRIMARY KEY,
+                    class_id INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    result TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                )
+            ''')
+            self._expire_import_jobs(cursor)
+            
+            # Per-table change counters, bumped by triggers on every write (used for HTTP ETags)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    table_name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            for table in self.VERSIONED_TABLES:
+                cursor.execute('INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)', (table,))
+                for event in ('INSERT', 'UPDATE', 'DELETE'):
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version
+                        AFTER {event} ON {table}
+                        BEGIN
+                            UPDATE data_versions SET version = version + 1 WHERE table_name = '{table}';
+                        END
+                    ''')
+            
+            self._commit(conn)
+            
+            # Gather planner statistics once when indexes were added, so they get picked for the
+            # joins; otherwise let SQLite decide whether anything is worth re-analyzing
+            if self._index_names(cursor) - indexes_before:
+                cursor.execute('ANALYZE')
+            else:
+                # Sample at most a few hundred rows per index so a large database boots quickly
+                cursor.execute('PRAGMA analysis_limit=400')
+                cursor.execute('PRAGMA optimize')
+    
+    @staticmethod
+    def _index_names(cursor: sqlite3.Cursor) -> set:
+        """Names of every index in the database"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        return {row[0] for row in cursor.fetchall()}
+    
+    def _migrate_cascading_foreign_keys(self, conn: sqlite3.Connection) -> None:
+        """Rebuild tables created before their foreign keys had ON DELETE CASCADE"""
+        if not self._stale_cascading_tables(conn):
+            return
+        
+        # Foreign key enforcement can only be switched off outside a transaction
+        conn.commit()
+        conn.execute('PRAGMA foreign_keys=OFF')
+        try:
+            # Every worker process boots at once: take the write lock, then check again,
+            # since another worker may have finished the rebuild while this one waited
+            conn.execute('BEGIN IMMEDIATE')
+            for table in self._stale_cascading_tables(conn):
+                create_sql = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()[0]
+                create_sql = create_sql.replace(f'CREATE TABLE {table}', f'CREATE TABLE {table}_new', 1)
+                create_sql = re.sub(r'(REFERENCES \w+ \(id\))(?! ON DELETE)', r'\1 ON DELETE CASCADE', create_sql)
+                sequence = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+                columns = ', '.join(column['name'] for column in conn.execute(f'PRAGMA table_info({table})'))
+                
+                conn.execute(create_sql)
+                conn.execute(f'INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}')
+                conn.execute(f'DROP TABLE {table}')
+                conn.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+                if sequence:
+                    # Keep AUTOINCREMENT from reissuing ids of rows deleted before the rebuild
+                    conn.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?', (sequence[0], table))
+            
+            self._delete_orphaned_rows(conn)
+            
+            conn.commit()
+        except (sqlite3.Error, RuntimeError):
+            conn.rollback()
+            raise
+        finally:
+            conn.execute('PRAGMA foreign_keys=ON')
+    
+    def _delete_orphaned_rows(self, conn: sqlite3.Connection) -> None:
+        """
+        Delete rows whose parent row no longer exists, as ON DELETE CASCADE would have.
+        
+        Older versions ran without foreign key enforcement, so deleting an enrollment, class or
+        teacher left grade history behind, and re-enrolling through INSERT OR REPLACE orphaned
+        grades. No endpoint can reach such rows, but they would make later writes fail. Classes
+        whose teacher is gone are still listed by id, so they are only deleted when the operator
+        sets SMARTGRADES_DELETE_ORPHANED_CLASSES=1.
+        """
+        # Each pass can orphan the dependents of the rows it deletes, so repeat until clean
+        violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+        while violations:
+            orphans = {}
+            for row in violations:
+                orphans.setdefault(row[0], set()).add(row[1])
+            
+            blocked = {table: rowids for table, rowids in orphans.items() if table not in self.ORPHAN_CLEANUP_TABLES}
+            if blocked and os.environ.get('SMARTGRADES_DELETE_ORPHANED_CLASSES') != '1':
+                details = '; '.join(
+                    f"{table}: {len(rowids)} row(s), rowid {', '.join(map(str, sorted(rowids)[:10]))}"
+                    + (', ...' if len(rowids) > 10 else '')
+                    for table, rowids in sorted(blocked.items())
+                )
+                raise RuntimeError(
+                    f'Rows reference parents that no longer exist ({details}). Reassign or delete them, '
+                    'or set SMARTGRADES_DELETE_ORPHANED_CLASSES=1 to delete them with their enrollments '
+                    'and grades, then restart.'
+                )
+            
+            for table, rowids in sorted(orphans.items()):
+                logger.warning('Deleting %d orphaned row(s) from %s', len(rowids), table)
+                self._executemany_batched(
+                    conn.cursor(), f'DELETE FROM {table} WHERE rowid = ?', ((rowid,) for rowid in rowids)
+                )
+            violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+    
+    def _stale_cascading_tables(self, conn: sqlite3.Connection) -> List[str]:
+        """CASCADING_TABLES that still have a foreign key without ON DELETE CASCADE"""
+        return [
+            table for table in self.CASCADING_TABLES
+            if any(fk['on_delete'] != 'CASCADE' for fk in conn.execute(f'PRAGMA foreign_key_list({table})'))
+        ]
+    
+    def _migrate_student_grades_without_rowid(self, conn: sqlite3.Connection) -> None:
+        """Rebuild a student_grades table from before it was keyed on (enrollment_id, assessment_id)"""
+        if 'WITHOUT ROWID' in self._student_grades_sql(conn):
+            return
+        
+        conn.commit()
+        try:
+            # Take the write lock before looking again: another worker booting at the same
+            # time may already have rebuilt the table while this one waited
+            conn.execute('BEGIN IMMEDIATE')
+            create_sql = self._student_grades_sql(conn)
+            if 'WITHOUT ROWID' in create_sql:
+                conn.rollback()
+                return
+            
+            # Drop the unused surrogate id and let the (enrollment_id, assessment_id) key be the table itself
+            # A table renamed by an earlier rebuild is stored as CREATE TABLE "student_grades"
+            create_sql = re.sub(r'CREATE TABLE "?student_grades"?', 'CREATE TABLE student_grades_new', create_sql, count=1)
+            create_sql = re.sub(r'\s*id INTEGER PRIMARY KEY AUTOINCREMENT,', '', create_sql, count=1)
+            create_sql = create_sql.replace(
+                'UNIQUE(enrollment_id, assessment_id)', 'PRIMARY KEY (enrollment_id, assessment_id)', 1
+            ) + ' WITHOUT ROWID'
+            columns = ', '.join(
+                column['name'] for column in conn.execute('PRAGMA table_info(student_grades)') if column['name'] != 'id'
+            )
+            
+            conn.execute(create_sql)
+            conn.execute(f'INSERT INTO student_grades_new ({columns}) SELECT {columns} FROM student_grades')
+            conn.execute('DROP TABLE student_grades')
+            conn.execute('ALTER TABLE student_grades_new RENAME TO student_grades')
+            conn.execute("DELETE FROM sqlite_sequence WHERE name = 'student_grades'")
             conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    
+    @staticmethod
+    def _student_grades_sql(conn: sqlite3.Connection) -> str:
+        """The CREATE TABLE statement student_grades is currently stored with"""
+        return conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'student_grades'"
+        ).fetchone()[0]
+    
+    def _ensure_unique_student_ids(self, conn: sqlite3.Connection) -> None:
+        """Enforce one row per external student_id, merging duplicates left by older versions"""
+        if self._has_unique_student_ids(conn):
+            return
+        
+        # As with the table rebuilds, lock first and check again in case another worker got here first
+        conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        if self._has_unique_student_ids(conn):
+            conn.rollback()
+            return
+        
+        # Keep the oldest row per student_id (the one enrollments were made against) with the newest details
+        conn.execute('''
+            UPDATE students SET (first_name, last_name, email) = (
+                SELECT newest.first_name, newest.last_name, newest.email
+                FROM students newest
+                WHERE newest.student_id = students.student_id
+                ORDER BY newest.id DESC LIMIT 1
+            )
+            WHERE id IN (SELECT MIN(id) FROM students GROUP BY student_id HAVING COUNT(*) > 1)
+        ''')
+        conn.execute('''
+            UPDATE OR IGNORE class_enrollments SET student_id = (
+                SELECT MIN(kept.id)
+                FROM students duplicate
+                JOIN students kept ON kept.student_id = duplicate.student_id
+                WHERE duplicate.id = class_enrollments.student_id
+            )
+            WHERE student_id NOT IN (SELECT MIN(id) FROM students GROUP BY student_id)
+        ''')
+        conn.execute('DELETE FROM students WHERE id NOT IN (SELECT MIN(id) FROM students GROUP BY student_id)')
+        conn.execute('DROP INDEX IF EXISTS idx_students_student_id')
+        conn.execute('CREATE UNIQUE INDEX idx_students_student_id_unique ON students(student_id)')
+        conn.commit()
+    
+    @staticmethod
+    def _has_unique_student_ids(conn: sqlite3.Connection) -> bool:
+        """Whether the unique index on students(student_id) already exists"""
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_students_student_id_unique'"
+        ).fetchone() is not None
+    
+    def get_data_version(self, tables: Tuple[str, ...]) -> int:
+        """Combined change counter for the given tables; increases whenever any of them is written"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(tables))
+            cursor.execute(f'SELECT COALESCE(SUM(version), 0) FROM data_versions WHERE table_name IN ({placeholders})', tables)
+            return cursor.fetchone()[0]
+    
+    def _cacheable_data_version(self, tables: Tuple[str, ...]) -> Optional[int]:
+        """
+        get_data_version for keying memoized reads, or None while this thread's connection holds
+        uncommitted writes: they may still roll back, so results computed from them are not cached
+        """
+        if self._thread_connection().in_transaction:
+            return None
+        return self.get_data_version(tables)
     
     # ===============================
     # TEACHER MANAGEMENT
@@ -148,8 +659,9 @@ class DatabaseManager:
                 INSERT INTO teachers (name, email)
                 VALUES (?, ?)
             ''', (name, email))
-            conn.commit()
-            return cursor.lastrowid
+            teacher_id = cursor.lastrowid
+            self._commit(conn)
+            return teacher_id
     
     def get_teacher(self, teacher_id: int) -> Optional[Dict[str, Any]]:
         """Get teacher by ID"""
@@ -166,47 +678,25 @@ class DatabaseManager:
             cursor.execute('SELECT * FROM teachers ORDER BY name')
             return [dict(row) for row in cursor.fetchall()]
     
+    def count_teachers_by_email(self, emails: List[str]) -> int:
+        """Count teachers whose email is in the given list (uses the UNIQUE email index)"""
+        if not emails:
+            return 0
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(emails))
+            cursor.execute(f'SELECT COUNT(*) FROM teachers WHERE email IN ({placeholders})', emails)
+            return cursor.fetchone()[0]
+    
     def delete_teacher(self, teacher_id: int) -> bool:
         """Delete a teacher and all associated data"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if teacher exists
-            cursor.execute('SELECT id FROM teachers WHERE id = ?', (teacher_id,))
-            if not cursor.fetchone():
-                return False
-            
-            # Delete in order due to foreign key constraints
-            # Get all classes for this teacher
-            cursor.execute('SELECT id FROM classes WHERE teacher_id = ?', (teacher_id,))
-            class_ids = [row['id'] for row in cursor.fetchall()]
-            
-            # Delete grades for all classes
-            for class_id in class_ids:
-                cursor.execute('''
-                    DELETE FROM student_grades 
-                    WHERE enrollment_id IN (
-                        SELECT id FROM class_enrollments WHERE class_id = ?
-                    )
-                ''', (class_id,))
-            
-            # Delete enrollments
-            cursor.execute('''
-                DELETE FROM class_enrollments 
-                WHERE class_id IN (SELECT id FROM classes WHERE teacher_id = ?)
-            ''', (teacher_id,))
-            
-            # Delete assessments
-            cursor.execute('DELETE FROM assessments WHERE class_id IN (SELECT id FROM classes WHERE teacher_id = ?)', (teacher_id,))
-            
-            # Delete classes
-            cursor.execute('DELETE FROM classes WHERE teacher_id = ?', (teacher_id,))
-            
-            # Finally delete teacher
+            # Classes, enrollments, assessments and grades follow via ON DELETE CASCADE
             cursor.execute('DELETE FROM teachers WHERE id = ?', (teacher_id,))
-            
-            conn.commit()
-            return True
+            self._commit(conn)
+            return cursor.rowcount > 0
     
     # ===============================
     # CLASS MANAGEMENT
@@ -221,8 +711,9 @@ class DatabaseManager:
                 INSERT INTO classes (teacher_id, class_name, subject, year, semester, grading_scale)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (teacher_id, class_name, subject, year, semester, grading_scale))
-            conn.commit()
-            return cursor.lastrowid
+            class_id = cursor.lastrowid
+            self._commit(conn)
+            return class_id
     
     def get_teacher_classes(self, teacher_id: int) -> List[Dict[str, Any]]:
         """Get all classes for a teacher"""
@@ -259,12 +750,43 @@ class DatabaseManager:
         """Add a new student"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO students (student_id, first_name, last_name, email)
+            # Update an existing student in place so its id (and enrollments) survive
+            upsert_sql = '''
+                INSERT INTO students (student_id, first_name, last_name, email)
                 VALUES (?, ?, ?, ?)
-            ''', (student_id, first_name, last_name, email))
-            conn.commit()
-            return cursor.lastrowid
+                ON CONFLICT(student_id) DO UPDATE SET
+                    first_name = excluded.first_name,
+                    last_name = excluded.last_name,
+                    email = excluded.email
+            '''
+            values = (student_id, first_name, last_name, email)
+            if self.HAS_RETURNING:
+                cursor.execute(upsert_sql + 'RETURNING id', values)
+            else:
+                # lastrowid is not set when the upsert updated an existing student
+                cursor.execute(upsert_sql, values)
+                cursor.execute('SELECT id FROM students WHERE student_id = ?', (student_id,))
+            student_internal_id = cursor.fetchone()[0]
+            self._commit(conn)
+            return student_internal_id
+    
+    def add_students_bulk(self, students: List[Tuple[str, str, str, Optional[str]]]) -> int:
+        """Add many (student_id, first_name, last_name, email) students in a single transaction"""
+        if not students:
+            return 0
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            self._executemany_batched(cursor, '''
+                INSERT INTO students (student_id, first_name, last_name, email)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(student_id) DO UPDATE SET
+                    first_name = excluded.first_name,
+                    last_name = excluded.last_name,
+                    email = excluded.email
+            ''', students)
+            self._commit(conn)
+        return len(students)
     
     def get_student_by_student_id(self, student_id: str) -> Optional[Dict[str, Any]]:
         """Get student by student_id"""
@@ -279,68 +801,68 @@ class DatabaseManager:
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Get student internal ID
-            cursor.execute('SELECT id FROM students WHERE student_id = ?', (student_id,))
-            student_row = cursor.fetchone()
-            if not student_row:
+            # Look up the student and enroll them in one statement; re-enrolling keeps the
+            # existing enrollment (and its grades) instead of replacing it
+            cursor.execute('''
+                INSERT INTO class_enrollments (class_id, student_id)
+                SELECT ?, id FROM students WHERE student_id = ?
+                ON CONFLICT(class_id, student_id) DO NOTHING
+            ''', (class_id, student_id))
+            self._commit(conn)
+            if cursor.rowcount > 0:
+                return cursor.lastrowid
+            
+            # Nothing inserted: either already enrolled or no such student
+            cursor.execute('''
+                SELECT ce.id
+                FROM class_enrollments ce
+                JOIN students s ON s.id = ce.student_id
+                WHERE ce.class_id = ? AND s.student_id = ?
+            ''', (class_id, student_id))
+            enrollment_row = cursor.fetchone()
+            if not enrollment_row:
                 raise ValueError(f"Student {student_id} not found")
+            return enrollment_row['id']
+    
+    def enroll_students_bulk(self, class_id: int, student_ids: List[str]) -> Dict[str, int]:
+        """Enroll many students in a class in a single transaction, returning student_id -> enrollment_id"""
+        if not student_ids:
+            return {}
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            self._executemany_batched(cursor, '''
+                INSERT INTO class_enrollments (class_id, student_id)
+                SELECT ?, id FROM students WHERE student_id = ?
+                ON CONFLICT(class_id, student_id) DO NOTHING
+            ''', ((class_id, student_id) for student_id in student_ids))
+            self._commit(conn)
             
             cursor.execute('''
-                INSERT OR REPLACE INTO class_enrollments (class_id, student_id)
-                VALUES (?, ?)
-            ''', (class_id, student_row['id']))
-            conn.commit()
-            return cursor.lastrowid
+                SELECT s.student_id, ce.id as enrollment_id
+                FROM class_enrollments ce
+                JOIN students s ON s.id = ce.student_id
+                WHERE ce.class_id = ?
+            ''', (class_id,))
+            return {row['student_id']: row['enrollment_id'] for row in cursor.fetchall()}
     
     def delete_enrollment(self, enrollment_id: int) -> bool:
         """Delete an enrollment (remove student from class)"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if enrollment exists
-            cursor.execute('SELECT id FROM class_enrollments WHERE id = ?', (enrollment_id,))
-            if not cursor.fetchone():
-                return False
-            
-            # Delete grades first
-            cursor.execute('DELETE FROM student_grades WHERE enrollment_id = ?', (enrollment_id,))
-            
-            # Delete enrollment
+            # The enrollment's grades follow via ON DELETE CASCADE
             cursor.execute('DELETE FROM class_enrollments WHERE id = ?', (enrollment_id,))
-            
-            conn.commit()
-            return True
+            self._commit(conn)
+            return cursor.rowcount > 0
     
     def delete_class(self, class_id: int) -> bool:
         """Delete a class and all associated data"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if class exists
-            cursor.execute('SELECT id FROM classes WHERE id = ?', (class_id,))
-            if not cursor.fetchone():
-                return False
-            
-            # Delete in order due to foreign key constraints
-            # Delete grades for this class
-            cursor.execute('''
-                DELETE FROM student_grades 
-                WHERE enrollment_id IN (
-                    SELECT id FROM class_enrollments WHERE class_id = ?
-                )
-            ''', (class_id,))
-            
-            # Delete enrollments
-            cursor.execute('DELETE FROM class_enrollments WHERE class_id = ?', (class_id,))
-            
-            # Delete assessments
-            cursor.execute('DELETE FROM assessments WHERE class_id = ?', (class_id,))
-            
-            # Finally delete class
+            # Enrollments, assessments and grades follow via ON DELETE CASCADE
             cursor.execute('DELETE FROM classes WHERE id = ?', (class_id,))
-            
-            conn.commit()
-            return True
+            self._commit(conn)
+            return cursor.rowcount > 0
     
     def get_class_students(self, class_id: int) -> List[Dict[str, Any]]:
         """Get all students enrolled in a class"""
@@ -368,8 +890,23 @@ class DatabaseManager:
                 INSERT INTO assessments (class_id, name, weight, due_date, description)
                 VALUES (?, ?, ?, ?, ?)
             ''', (class_id, name, weight, due_date, description))
-            conn.commit()
-            return cursor.lastrowid
+            assessment_id = cursor.lastrowid
+            self._commit(conn)
+            return assessment_id
+    
+    def add_assessments_bulk(self, class_id: int, assessments: List[Tuple[str, float, str, str]]) -> int:
+        """Add many (name, weight, due_date, description) assessments to a class in a single transaction"""
+        if not assessments:
+            return 0
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            self._executemany_batched(cursor, '''
+                INSERT INTO assessments (class_id, name, weight, due_date, description)
+                VALUES (?, ?, ?, ?, ?)
+            ''', ((class_id, *assessment) for assessment in assessments))
+            self._commit(conn)
+        return len(assessments)
     
     def get_class_assessments(self, class_id: int) -> List[Dict[str, Any]]:
         """Get all assessments for a class"""
@@ -387,47 +924,29 @@ class DatabaseManager:
         if not kwargs:
             return False
         
-        allowed_fields = ['name', 'weight', 'due_date', 'description']
-        fields = []
-        values = []
-        
-        for key, value in kwargs.items():
-            if key in allowed_fields:
-                fields.append(f"{key} = ?")
-                values.append(value)
-        
+        # Sorted so the same field set gives the same SQL string whatever the argument order
+        fields = tuple(sorted(_ASSESSMENT_UPDATE_FIELDS.intersection(kwargs)))
         if not fields:
             return False
         
+        values = [kwargs[field] for field in fields]
         values.append(assessment_id)
         
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(f'''
-                UPDATE assessments SET {', '.join(fields)}
-                WHERE id = ?
-            ''', values)
-            conn.commit()
+            # Same field set -> same SQL string, so sqlite3's statement cache can reuse it
+            cursor.execute(_assessment_update_sql(fields), values)
+            self._commit(conn)
             return cursor.rowcount > 0
     
     def delete_assessment(self, assessment_id: int) -> bool:
         """Delete an assessment and all associated grades"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Check if assessment exists
-            cursor.execute('SELECT id FROM assessments WHERE id = ?', (assessment_id,))
-            if not cursor.fetchone():
-                return False
-            
-            # Delete grades for this assessment first
-            cursor.execute('DELETE FROM student_grades WHERE assessment_id = ?', (assessment_id,))
-            
-            # Delete the assessment
+            # Grades for the assessment follow via ON DELETE CASCADE
             cursor.execute('DELETE FROM assessments WHERE id = ?', (assessment_id,))
-            
-            conn.commit()
-            return True
+            self._commit(conn)
+            return cursor.rowcount > 0
     
     # ===============================
     # GRADE MANAGEMENT
@@ -437,16 +956,27 @@ class DatabaseManager:
         """Update a student's grade for an assessment"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO student_grades (enrollment_id, assessment_id, score)
-                VALUES (?, ?, ?)
-            ''', (enrollment_id, assessment_id, score))
-            conn.commit()
+            cursor.execute(_GRADE_UPSERT_SQL, (enrollment_id, assessment_id, score))
             
-            # Save to grade history
-            self.save_grade_history(enrollment_id)
+            # Save to grade history in the same transaction as the grade
+            self._insert_grade_history(cursor, [enrollment_id])
+            self._commit(conn)
             return True
     
+    def update_student_grades_bulk(self, grades: List[Tuple[int, int, float]]) -> int:
+        """Update many (enrollment_id, assessment_id, score) grades in a single transaction"""
+        if not grades:
+            return 0
+        
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            self._executemany_batched(cursor, _GRADE_UPSERT_SQL, grades)
+            
+            # Save to grade history once per affected enrollment, committed with the grades
+            self._insert_grade_history(cursor, list(dict.fromkeys(grade[0] for grade in grades)))
+            self._commit(conn)
+        return len(grades)
+    
     def get_student_grades(self, enrollment_id: int) -> List[Dict[str, Any]]:
         """Get all grades for a student in a class"""
         with self.get_db_connection() as conn:
@@ -459,14 +989,60 @@ class DatabaseManager:
                 JOIN class_enrollments ce ON a.class_id = ce.class_id
                 JOIN classes c ON ce.class_id = c.id
                 WHERE ce.id = ?
-                ORDER BY a.due_date, a.created_at
+                ORDER BY a.due_date, a.created_at, a.id
             ''', (enrollment_id, enrollment_id))
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_all_grades_with_calc_for_class(self, class_id: int) -> Dict[int, Tuple[List[Dict[str, Any]], Dict[str, float]]]:
+        """Get every student's grades and grade calculation for a class, keyed by enrollment ID"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT ce.id as enrollment_id, a.id as assessment_id, a.name, a.weight, a.due_date, a.description,
+                       sg.score, sg.graded_at, ce.class_id, c.class_name, c.subject
+                FROM class_enrollments ce
+                LEFT JOIN assessments a ON a.class_id = ce.class_id
+                LEFT JOIN student_grades sg ON a.id = sg.assessment_id AND sg.enrollment_id = ce.id
+                JOIN classes c ON ce.class_id = c.id
+                WHERE ce.class_id = ?
+                ORDER BY ce.id, a.due_date, a.created_at, a.id
+            ''', (class_id,))
+            rows = cursor.fetchall()
+            
+        results = {}
+        for enrollment_id, group in groupby(rows, key=itemgetter('enrollment_id')):
+            grades = []
+            for row in group:
+                # Enrollments in a class without assessments yield one all-NULL row
+                if row['assessment_id'] is not None:
+                    grade = dict(row)
+                    del grade['enrollment_id']
+                    grades.append(grade)
+            results[enrollment_id] = (grades, self._calculate_grade_from_rows(grades))
+        return results
+    
+    def get_student_grades_with_calc(self, enrollment_id: int) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Get a student's grades together with the grade calculation made from them"""
+        grades = self.get_student_grades(enrollment_id)
+        return grades, self._calculate_grade_from_rows(grades)
+    
     def calculate_student_grade(self, enrollment_id: int) -> Dict[str, float]:
         """Calculate current grade for a student"""
-        grades = self.get_student_grades(enrollment_id)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Only the columns the calculation needs, in get_student_grades order so the sums match
+            cursor.execute('''
+                SELECT a.weight, sg.score
+                FROM class_enrollments ce
+                JOIN assessments a ON a.class_id = ce.class_id
+                LEFT JOIN student_grades sg ON a.id = sg.assessment_id AND sg.enrollment_id = ce.id
+                WHERE ce.id = ?
+                ORDER BY a.due_date, a.created_at, a.id
+            ''', (enrollment_id,))
+            return self._calculate_grade_from_rows(cursor.fetchall())
         
+    def _calculate_grade_from_rows(self, grades: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Calculate a grade from a student's assessment rows (weight and score)"""
         total_weight = 0
         weighted_score = 0
         completed_weight = 0
@@ -478,6 +1054,41 @@ class DatabaseManager:
                     weighted_score += grade['score'] * grade['weight'] / 100
                     completed_weight += grade['weight']
         
+        return self._summarize_grade(total_weight, weighted_score, completed_weight)
+    
+    def calculate_grades_for_class(self, class_id: int) -> Dict[int, Dict[str, float]]:
+        """Calculate current grades for every student in a class, memoized per data version of GRADE_TABLES"""
+        data_version = self._cacheable_data_version(self.GRADE_TABLES)
+        if data_version is None:
+            return self._calculate_grades_for_class(class_id, data_version)
+        
+        # Copies, so callers can't alter the memoized calculations
+        grade_calcs = self._cached_class_grades(class_id, data_version)
+        return {enrollment_id: dict(grade_calc) for enrollment_id, grade_calc in grade_calcs.items()}
+    
+    def _calculate_grades_for_class(self, class_id: int, data_version: Optional[int]) -> Dict[int, Dict[str, float]]:
+        """Calculate current grades for every student in a class with a single query; data_version only keys the memoized copy"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            # Same row order as get_student_grades so the sums match calculate_student_grade exactly
+            cursor.execute('''
+                SELECT ce.id as enrollment_id, a.weight, sg.score
+                FROM class_enrollments ce
+                LEFT JOIN assessments a ON a.class_id = ce.class_id
+                LEFT JOIN student_grades sg ON a.id = sg.assessment_id AND sg.enrollment_id = ce.id
+                WHERE ce.class_id = ?
+                ORDER BY ce.id, a.due_date, a.created_at, a.id
+            ''', (class_id,))
+            rows = cursor.fetchall()
+            
+        return {
+            enrollment_id: self._calculate_grade_from_rows(list(group))
+            for enrollment_id, group in groupby(rows, key=itemgetter('enrollment_id'))
+        }
+    
+    @staticmethod
+    def _summarize_grade(total_weight: float, weighted_score: float, completed_weight: float) -> Dict[str, float]:
+        """Build the grade calculation dict from aggregated weights and scores"""
         # Handle empty data gracefully
         predicted = (weighted_score / completed_weight * 100) if completed_weight > 0 else 0
         
@@ -489,38 +1100,142 @@ class DatabaseManager:
             'remaining_weight': float(max(0, total_weight - completed_weight))
         }
     
-    def save_grade_history(self, enrollment_id: int) -> int:
-        """Save current grade calculation to history"""
-        grade_data = self.calculate_student_grade(enrollment_id)
-        
-        with self.get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
+    def _insert_grade_history(self, cursor: sqlite3.Cursor, enrollment_ids: List[int]) -> None:
+        """Insert a grade_history row per enrollment, calculating all their grades in one query per chunk"""
+        for chunk in _chunked(enrollment_ids, self.MAX_IN_PARAMETERS):
+            placeholders = ','.join('?' * len(chunk))
+            # Same row order as get_student_grades so the sums match calculate_student_grade exactly
+            cursor.execute(f'''
+                SELECT ce.id as enrollment_id, a.weight, sg.score
+                FROM class_enrollments ce
+                LEFT JOIN assessments a ON a.class_id = ce.class_id
+                LEFT JOIN student_grades sg ON a.id = sg.assessment_id AND sg.enrollment_id = ce.id
+                WHERE ce.id IN ({placeholders})
+                ORDER BY ce.id, a.due_date, a.created_at, a.id
+            ''', chunk)
+            grade_calcs = {
+                enrollment_id: self._calculate_grade_from_rows(list(group))
+                for enrollment_id, group in groupby(cursor.fetchall(), key=itemgetter('enrollment_id'))
+            }
+            
+            cursor.executemany('''
                 INSERT INTO grade_history (enrollment_id, predicted_grade, weighted_score)
                 VALUES (?, ?, ?)
-            ''', (enrollment_id, grade_data['predicted'], grade_data['weighted_score']))
-            conn.commit()
-            return cursor.lastrowid
+            ''', [
+                (enrollment_id, grade_calcs[enrollment_id]['predicted'], grade_calcs[enrollment_id]['weighted_score'])
+                for enrollment_id in chunk if enrollment_id in grade_calcs
+            ])
 
     # ===============================
     # ADVANCED PREDICTION SYSTEM
     # ===============================
 
-    def predict_missing_assessment_score(self, enrollment_id: int, assessment_id: int, algorithm_mode: str = 'ensemble') -> Dict[str, Any]:
+    def predict_missing_assessment_score(self, enrollment_id: int, assessment_id: int, algorithm_mode: str = 'ensemble',
+                                         include_context: bool = False
+                                         ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
         """
         Predict what score a student will likely achieve on a missing assessment
         using advanced pattern analysis and machine learning techniques
+        
+        With include_context=True, returns a (prediction, assessment_info) tuple where
+        assessment_info holds the assessment's name, weight, description, class_name
+        and subject, or is None if the assessment does not exist.
+        
+        Results are memoized per data version of PREDICTION_TABLES, so any write to
+        grades, assessments, enrollments or classes retires the cached entries.
         """
-        try:
-            # Get student's historical performance data
-            student_patterns = self._analyze_student_patterns(enrollment_id)
-            
-            # Get assessment difficulty and characteristics
-            assessment_analysis = self._analyze_assessment_difficulty(assessment_id, enrollment_id)
+        # Unknown modes fall through to the ensemble, so unhashable ones can share its key
+        mode_key = algorithm_mode if isinstance(algorithm_mode, str) else 'ensemble'
+        data_version = self._cacheable_data_version(self.PREDICTION_TABLES)
+        if data_version is None:
+            result, context = self._predict_with_context(enrollment_id, assessment_id, mode_key, None)
+        else:
+            result, context = copy.deepcopy(
+                self._cached_prediction(enrollment_id, assessment_id, mode_key, data_version)
+            )
+        return (result, context) if include_context else result
+    
+    def predict_assessment_scores_for_class(self, assessment_id: int, algorithm_mode: str = 'ensemble'
+                                            ) -> Tuple[Dict[int, Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Predict every enrolled student's score on an assessment in one pass
+        
+        Returns ({enrollment_id: prediction}, assessment_info) in the same shapes as
+        predict_missing_assessment_score with include_context=True, or ({}, None) if the
+        assessment does not exist. The class's grades are read and its class-wide patterns
+        analyzed once, instead of once per student.
+        """
+        if not isinstance(algorithm_mode, str):
+            algorithm_mode = 'ensemble'  # Unknown modes fall through to the ensemble anyway
+        assessment_info, enrollments, grade_rows = self._get_class_prediction_data(assessment_id)
+        if assessment_info is None:
+            return {}, None
+        
+        class_patterns = self._analyze_class_patterns(grade_rows)
+        rows_by_enrollment = {
+            enrollment_id: list(group)
+            for enrollment_id, group in groupby(grade_rows, key=itemgetter('enrollment_id'))
+        }
+        
+        predictions = {}
+        context = None
+        for enrollment in enrollments:
+            enrollment_id = enrollment['id']
+            if enrollment['has_other_class_grades']:
+                # Grades outside this class also feed the student's patterns; take the single path
+                predictions[enrollment_id] = self.predict_missing_assessment_score(
+                    enrollment_id, assessment_id, algorithm_mode
+                )
+                continue
             
-            # Get class performance patterns for comparison
-            class_patterns = self._analyze_class_patterns(assessment_id)
+            try:
+                assessment_analysis = self._analyze_assessment_difficulty(
+                    assessment_info, assessment_id, enrollment_id, grade_rows
+                )
+                context = assessment_analysis.pop('context')
+                student_patterns = self._analyze_student_patterns(rows_by_enrollment.get(enrollment_id, []))
+            except Exception:
+                predictions[enrollment_id] = self._fallback_prediction(enrollment_id, assessment_id)
+            else:
+                predictions[enrollment_id] = self._predict_from_analyses(
+                    enrollment_id, assessment_id, algorithm_mode,
+                    student_patterns, assessment_analysis, class_patterns
+                )
+        
+        if context is None:
+            context = self._get_assessment_context(assessment_id)
+        return predictions, context
+    
+    def _predict_with_context(self, enrollment_id: int, assessment_id: int, algorithm_mode: str,
+                              data_version: Optional[int]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Compute a prediction and its assessment context; data_version only keys the memoized
+        copy, and None (uncommitted writes pending) bypasses the memoized analyses as well
+        """
+        try:
+            # Analyses shared by every algorithm mode, memoized for this data version
+            prediction_inputs = self._prediction_inputs if data_version is None else self._cached_prediction_inputs
+            student_patterns, assessment_analysis, class_patterns, context = prediction_inputs(
+                enrollment_id, assessment_id, data_version
+            )
+        except Exception:
+            # Fallback to basic prediction if advanced fails
+            result = self._fallback_prediction(enrollment_id, assessment_id)
+            context = None
+        else:
+            result = self._predict_from_analyses(
+                enrollment_id, assessment_id, algorithm_mode,
+                student_patterns, assessment_analysis, class_patterns
+            )
             
+        if context is None:
+            context = self._get_assessment_context(assessment_id)
+        return result, context
+    
+    def _predict_from_analyses(self, enrollment_id: int, assessment_id: int, algorithm_mode: str,
+                               student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
+        """Apply the selected algorithms to prepared analyses, falling back to a basic prediction if they fail"""
+        try:
             # Apply prediction algorithms based on selected mode
             predictions = self._calculate_ml_predictions(
                 student_patterns, 
@@ -537,165 +1252,241 @@ class DatabaseManager:
                 'algorithm_breakdown': predictions['algorithms']
             }
             
-        except Exception as e:
+        except Exception:
             # Fallback to basic prediction if advanced fails
             return self._fallback_prediction(enrollment_id, assessment_id)
     
-    def _analyze_student_patterns(self, enrollment_id: int) -> Dict[str, Any]:
-        """Analyze individual student's performance patterns and trends"""
+    def _prediction_inputs(self, enrollment_id: int, assessment_id: int,
+                           data_version: int) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Analyze the student, the assessment and the class for a prediction, returning
+        (student_patterns, assessment_analysis, class_patterns, context)
+        
+        The result is memoized per data version and shared across algorithm modes, so the
+        prediction algorithms must treat it as read-only.
+        """
+        # Assessment details and every grade the analyses need, read once
+        assessment_info, grade_rows = self._get_prediction_data(assessment_id, enrollment_id)
+        
+        # Get assessment difficulty and characteristics
+        assessment_analysis = self._analyze_assessment_difficulty(
+            assessment_info, assessment_id, enrollment_id, grade_rows
+        )
+        context = assessment_analysis.pop('context')
+        
+        # Get student's historical performance data
+        student_patterns = self._analyze_student_patterns(
+            [row for row in grade_rows if row['enrollment_id'] == enrollment_id]
+        )
+        
+        # Get class performance patterns for comparison
+        class_patterns = self._analyze_class_patterns(
+            [row for row in grade_rows if row['class_id'] == assessment_info['class_id']]
+        )
+        return student_patterns, assessment_analysis, class_patterns, context
+    
+    def _get_assessment_context(self, assessment_id: int) -> Optional[Dict[str, Any]]:
+        """Get an assessment's details along with its class name and subject"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Get all student's grades with timestamps
             cursor.execute('''
-                SELECT g.score, a.name, a.weight, g.graded_at, a.due_date,
-                       a.description, c.subject
-                FROM student_grades g
-                JOIN assessments a ON g.assessment_id = a.id
-                JOIN class_enrollments e ON g.enrollment_id = e.id
-                JOIN classes c ON e.class_id = c.id
-                WHERE g.enrollment_id = ? AND g.score IS NOT NULL
-                ORDER BY g.graded_at ASC
-            ''', (enrollment_id,))
-            
-            grades_data = cursor.fetchall()
-            
-            if len(grades_data) < 2:
-                return {'insufficient_data': True}
-            
-            # Calculate performance trends
-            scores = [float(row[0]) for row in grades_data]
-            weights = [float(row[2]) for row in grades_data]
-            
-            # Trend analysis using linear regression
-            trend_slope = self._calculate_trend_slope(scores)
-            
-            # Performance consistency analysis
-            consistency = self._calculate_consistency_score(scores)
-            
-            # Assessment type performance analysis
-            type_performance = self._analyze_assessment_type_performance(grades_data)
-            
-            # Improvement/decline pattern analysis
-            improvement_pattern = self._analyze_improvement_pattern(scores)
-            
-            return {
-                'trend_slope': trend_slope,
-                'consistency_score': consistency,
-                'average_performance': sum(scores) / len(scores),
-                'weighted_average': sum(s * w for s, w in zip(scores, weights)) / sum(weights),
-                'type_performance': type_performance,
-                'improvement_pattern': improvement_pattern,
-                'total_assessments': len(scores),
-                'performance_range': {'min': min(scores), 'max': max(scores)},
-                'recent_performance': scores[-3:] if len(scores) >= 3 else scores
-            }
+                SELECT a.name, a.weight, a.description, c.class_name, c.subject
+                FROM assessments a
+                JOIN classes c ON a.class_id = c.id
+                WHERE a.id = ?
+            ''', (assessment_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
     
-    def _analyze_assessment_difficulty(self, assessment_id: int, current_enrollment_id: int) -> Dict[str, Any]:
-        """Analyze the difficulty and characteristics of the target assessment"""
+    def _get_prediction_data(self, assessment_id: int, enrollment_id: int) -> Tuple[Optional[sqlite3.Row], List[sqlite3.Row]]:
+        """
+        Get the target assessment's details and the scored grades of its class,
+        plus the student's own grades, ordered by student then grading time
+        """
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
             
             # Get assessment details
             cursor.execute('''
-                SELECT a.name, a.weight, a.description, a.due_date, c.subject
+                SELECT a.class_id, a.name, a.weight, a.description, a.due_date, c.subject, c.class_name
                 FROM assessments a
                 JOIN classes c ON a.class_id = c.id
                 WHERE a.id = ?
             ''', (assessment_id,))
-            
             assessment_info = cursor.fetchone()
+            if assessment_info is None:
+                return None, []
             
-            # Get class performance on this assessment (excluding current student)
+            # One query serves the student, assessment and class analyses. The student's own
+            # grades are unioned in separately (an OR would scan every assessment) so they are
+            # found even if the enrollment belongs to another class.
             cursor.execute('''
-                SELECT g.score
+                SELECT g.enrollment_id, g.assessment_id, g.score, g.graded_at,
+                       a.class_id, a.name, a.weight, a.description, a.due_date, a.created_at
                 FROM student_grades g
-                JOIN class_enrollments e ON g.enrollment_id = e.id
-                WHERE g.assessment_id = ? AND g.enrollment_id != ? AND g.score IS NOT NULL
-            ''', (assessment_id, current_enrollment_id))
-            
-            class_scores = [float(row[0]) for row in cursor.fetchall()]
-            
-            if not class_scores:
-                # No class data available, estimate based on weight
-                difficulty_estimate = self._estimate_difficulty_from_weight(float(assessment_info[1]))
-                return {
-                    'estimated_difficulty': difficulty_estimate,
-                    'class_average': None,
-                    'assessment_type': self._classify_assessment_type(assessment_info[0], assessment_info[2]),
-                    'weight': float(assessment_info[1]),
-                    'has_class_data': False
-                }
-            
-            # Calculate difficulty metrics
-            class_average = sum(class_scores) / len(class_scores)
-            class_std_dev = (sum((x - class_average) ** 2 for x in class_scores) / len(class_scores)) ** 0.5
-            
-            # Difficulty classification
-            if class_average >= 85:
-                difficulty = 'easy'
-            elif class_average >= 75:
-                difficulty = 'moderate'
-            elif class_average >= 65:
-                difficulty = 'hard'
-            else:
-                difficulty = 'very_hard'
-            
-            return {
-                'class_average': class_average,
-                'class_std_dev': class_std_dev,
-                'difficulty': difficulty,
-                'assessment_type': self._classify_assessment_type(assessment_info[0], assessment_info[2]),
-                'weight': float(assessment_info[1]),
-                'score_distribution': class_scores,
-                'has_class_data': True
-            }
+                JOIN assessments a ON g.assessment_id = a.id
+                WHERE a.class_id = ? AND g.score IS NOT NULL
+                UNION
+                SELECT g.enrollment_id, g.assessment_id, g.score, g.graded_at,
+                       a.class_id, a.name, a.weight, a.description, a.due_date, a.created_at
+                FROM student_grades g
+                JOIN assessments a ON g.assessment_id = a.id
+                WHERE g.enrollment_id = ? AND g.score IS NOT NULL
+                ORDER BY enrollment_id, graded_at, due_date, created_at, assessment_id
+            ''', (assessment_info['class_id'], enrollment_id))
+            return assessment_info, cursor.fetchall()
     
-    def _analyze_class_patterns(self, assessment_id: int) -> Dict[str, Any]:
-        """Analyze how the class typically performs on similar assessments"""
+    def _get_class_prediction_data(self, assessment_id: int
+                                   ) -> Tuple[Optional[sqlite3.Row], List[sqlite3.Row], List[sqlite3.Row]]:
+        """
+        Get the target assessment's details, the class's enrollments (flagging any with scored
+        grades in another class) and the class's scored grades, ordered by student then grading time
+        """
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
-            # Get class information
             cursor.execute('''
-                SELECT c.id, c.class_name, c.subject
+                SELECT a.class_id, a.name, a.weight, a.description, a.due_date, c.subject, c.class_name
                 FROM assessments a
                 JOIN classes c ON a.class_id = c.id
                 WHERE a.id = ?
             ''', (assessment_id,))
+            assessment_info = cursor.fetchone()
+            if assessment_info is None:
+                return None, [], []
             
-            class_info = cursor.fetchone()
-            class_id = class_info[0]
+            cursor.execute('''
+                SELECT ce.id, EXISTS (
+                    SELECT 1
+                    FROM student_grades g
+                    JOIN assessments a ON g.assessment_id = a.id
+                    WHERE g.enrollment_id = ce.id AND a.class_id != ce.class_id AND g.score IS NOT NULL
+                ) as has_other_class_grades
+                FROM class_enrollments ce
+                WHERE ce.class_id = ?
+                ORDER BY ce.id
+            ''', (assessment_info['class_id'],))
+            enrollments = cursor.fetchall()
             
-            # Get all class performance data for pattern analysis
+            # Same rows and order as the class half of _get_prediction_data
             cursor.execute('''
-                SELECT g.score, a.weight, a.name, e.id as enrollment_id
+                SELECT g.enrollment_id, g.assessment_id, g.score, g.graded_at,
+                       a.class_id, a.name, a.weight, a.description, a.due_date, a.created_at
                 FROM student_grades g
                 JOIN assessments a ON g.assessment_id = a.id
-                JOIN class_enrollments e ON g.enrollment_id = e.id
                 WHERE a.class_id = ? AND g.score IS NOT NULL
-                ORDER BY e.id, g.graded_at
-            ''', (class_id,))
+                ORDER BY g.enrollment_id, g.graded_at, a.due_date, a.created_at, g.assessment_id
+            ''', (assessment_info['class_id'],))
+            return assessment_info, enrollments, cursor.fetchall()
+            
+    def _analyze_student_patterns(self, grades_data: List[sqlite3.Row]) -> Dict[str, Any]:
+        """Analyze individual student's performance patterns and trends from their scored grades in grading order"""
+        if len(grades_data) < 2:
+            return {'insufficient_data': True}
+            
+        # Calculate performance trends
+        scores = np.fromiter((row['score'] for row in grades_data), dtype=np.float64, count=len(grades_data))
+        weights = np.fromiter((row['weight'] for row in grades_data), dtype=np.float64, count=len(grades_data))
             
-            all_class_data = cursor.fetchall()
+        # Trend analysis using linear regression
+        trend_slope = self._calculate_trend_slope(scores)
             
-            # Group by student to analyze individual patterns
-            student_patterns = {}
-            for score, weight, name, enroll_id in all_class_data:
-                if enroll_id not in student_patterns:
-                    student_patterns[enroll_id] = []
-                student_patterns[enroll_id].append(float(score))
+        # Performance consistency analysis
+        consistency = self._calculate_consistency_score(scores)
             
-            # Calculate class-wide statistics
-            all_scores = [float(row[0]) for row in all_class_data]
+        # Assessment type performance analysis
+        type_performance = self._analyze_assessment_type_performance(grades_data)
             
+        # Improvement/decline pattern analysis
+        improvement_pattern = self._analyze_improvement_pattern(scores)
+            
+        return {
+            'trend_slope': trend_slope,
+            'consistency_score': consistency,
+            'average_performance': float(scores.mean()),
+            'weighted_average': float(np.average(scores, weights=weights)),
+            'type_performance': type_performance,
+            'improvement_pattern': improvement_pattern,
+            'total_assessments': len(scores),
+            'performance_range': {'min': float(scores.min()), 'max': float(scores.max())},
+            'recent_performance': scores[-3:].tolist()
+        }
+    
+    def _analyze_assessment_difficulty(self, assessment_info: sqlite3.Row, assessment_id: int, current_enrollment_id: int,
+                                       grade_rows: List[sqlite3.Row]) -> Dict[str, Any]:
+        """Analyze the difficulty and characteristics of the target assessment"""
+        # Context returned alongside predictions so callers need no second lookup
+        context = {
+            'name': assessment_info['name'],
+            'weight': assessment_info['weight'],
+            'description': assessment_info['description'],
+            'class_name': assessment_info['class_name'],
+            'subject': assessment_info['subject']
+        }
+        
+        # Class performance on this assessment (excluding current student)
+        class_scores = np.fromiter(
+            (
+                row['score'] for row in grade_rows
+                if row['assessment_id'] == assessment_id and row['enrollment_id'] != current_enrollment_id
+            ),
+            dtype=np.float64
+        )
+        
+        if not class_scores.size:
+            # No class data available, estimate based on weight
+            difficulty_estimate = self._estimate_difficulty_from_weight(float(assessment_info['weight']))
             return {
-                'class_average': sum(all_scores) / len(all_scores) if all_scores else 0,
-                'student_count': len(student_patterns),
-                'total_grades': len(all_scores),
-                'performance_patterns': self._analyze_class_performance_patterns(student_patterns)
+                'estimated_difficulty': difficulty_estimate,
+                'class_average': None,
+                'assessment_type': self._classify_assessment_type(assessment_info['name'], assessment_info['description']),
+                'weight': float(assessment_info['weight']),
+                'has_class_data': False,
+                'context': context
             }
     
+        # Calculate difficulty metrics
+        class_average = float(class_scores.mean())
+        class_std_dev = float(class_scores.std())
+            
+        # Difficulty classification
+        if class_average >= 85:
+            difficulty = 'easy'
+        elif class_average >= 75:
+            difficulty = 'moderate'
+        elif class_average >= 65:
+            difficulty = 'hard'
+        else:
+            difficulty = 'very_hard'
+            
+        return {
+            'class_average': class_average,
+            'class_std_dev': class_std_dev,
+            'difficulty': difficulty,
+            'assessment_type': self._classify_assessment_type(assessment_info['name'], assessment_info['description']),
+            'weight': float(assessment_info['weight']),
+            'score_distribution': np.sort(class_scores)[::-1].tolist(),  # Highest first, i.e. by rank
+            'has_class_data': True,
+            'context': context
+        }
+            
+    def _analyze_class_patterns(self, all_class_data: List[sqlite3.Row]) -> Dict[str, Any]:
+        """Analyze how the class typically performs on similar assessments, from its scored grades by student"""
+        # Group by student to analyze individual patterns
+        student_patterns = {
+            enroll_id: [float(row['score']) for row in group]
+            for enroll_id, group in groupby(all_class_data, key=itemgetter('enrollment_id'))
+        }
+            
+        # Calculate class-wide statistics
+        all_scores = [float(row['score']) for row in all_class_data]
+            
+        return {
+            'class_average': sum(all_scores) / len(all_scores) if all_scores else 0,
+            'student_count': len(student_patterns),
+            'total_grades': len(all_scores),
+            'performance_patterns': self._analyze_class_performance_patterns(student_patterns)
+        }
+    
     def _calculate_ml_predictions(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict, algorithm_mode: str = 'ensemble') -> Dict[str, Any]:
         """Apply multiple ML algorithms to generate final prediction"""
         
@@ -703,65 +1494,30 @@ class DatabaseManager:
             return self._generate_insufficient_data_prediction(assessment_analysis)
         
         # Handle different algorithm modes (including required scikit-learn models)
-        if algorithm_mode == 'linear_regression':
-            return self._sklearn_linear_regression(student_patterns, assessment_analysis, class_patterns)
-        elif algorithm_mode == 'polynomial_regression':
-            return self._sklearn_polynomial_regression(student_patterns, assessment_analysis, class_patterns)
-        elif algorithm_mode == 'single':
-            return self._single_algorithm_predictions(student_patterns, assessment_analysis, class_patterns)
-        elif algorithm_mode == 'rank_only':
-            return self._rank_only_prediction(student_patterns, assessment_analysis, class_patterns)
-        elif algorithm_mode == 'trend_only':
-            return self._trend_only_prediction(student_patterns, assessment_analysis)
-        elif algorithm_mode == 'difficulty_only':
-            return self._difficulty_only_prediction(student_patterns, assessment_analysis)
-        elif algorithm_mode == 'type_only':
-            return self._type_only_prediction(student_patterns, assessment_analysis)
-        elif algorithm_mode == 'comparative_only':
-            return self._comparative_only_prediction(student_patterns, assessment_analysis, class_patterns)
-        # Default: ensemble mode (now includes scikit-learn models)
-        
-        predictions = {}
-        weights = {}
-        
-        # Algorithm 1: Scikit-learn Linear Regression (REQUIRED by assessment)
-        linear_prediction = self._sklearn_linear_regression_value(student_patterns, assessment_analysis, class_patterns)
-        predictions['linear_regression'] = linear_prediction
-        weights['linear_regression'] = 0.15
-        
-        # Algorithm 2: Scikit-learn Polynomial Regression (REQUIRED by assessment)  
-        poly_prediction = self._sklearn_polynomial_regression_value(student_patterns, assessment_analysis, class_patterns)
-        predictions['polynomial_regression'] = poly_prediction
-        weights['polynomial_regression'] = 0.15
-        
-        # Algorithm 3: Trend-based prediction
-        trend_prediction = self._trend_based_prediction(student_patterns, assessment_analysis)
-        predictions['trend'] = trend_prediction
-        weights['trend'] = 0.15
-        
-        # Algorithm 4: Performance type correlation
-        type_prediction = self._type_correlation_prediction(student_patterns, assessment_analysis)
-        predictions['type_correlation'] = type_prediction
-        weights['type_correlation'] = 0.15
-        
-        # Algorithm 5: Difficulty adjustment prediction
-        difficulty_prediction = self._difficulty_adjusted_prediction(student_patterns, assessment_analysis)
-        predictions['difficulty'] = difficulty_prediction
-        weights['difficulty'] = 0.15
-        
-        # Algorithm 6: Class comparative prediction
-        comparative_prediction = self._class_comparative_prediction(student_patterns, assessment_analysis, class_patterns)
-        predictions['comparative'] = comparative_prediction
-        weights['comparative'] = 0.1
-        
-        # Algorithm 7: Rank-based prediction (HSC-style)
-        rank_prediction = self._rank_based_prediction(student_patterns, assessment_analysis, class_patterns)
-        predictions['rank_based'] = rank_prediction
-        weights['rank_based'] = 0.15
-        
-        # Weighted ensemble prediction
-        final_prediction = sum(predictions[alg] * weights[alg] for alg in predictions)
-        final_prediction = max(0, min(100, final_prediction))  # Clamp to valid range
+        mode_prediction = self._mode_predictions.get(algorithm_mode)
+        if mode_prediction is not None:
+            return mode_prediction(student_patterns, assessment_analysis, class_patterns)
+        # Default: ensemble mode (now includes scikit-learn models), one prediction per ENSEMBLE_ALGORITHMS entry
+        algorithm_predictions = [
+            # Scikit-learn Linear Regression (REQUIRED by assessment)
+            self._sklearn_linear_regression_value(student_patterns, assessment_analysis, class_patterns),
+            # Scikit-learn Polynomial Regression (REQUIRED by assessment)
+            self._sklearn_polynomial_regression_value(student_patterns, assessment_analysis, class_patterns),
+            # Trend-based prediction
+            self._trend_based_prediction(student_patterns, assessment_analysis),
+            # Performance type correlation
+            self._type_correlation_prediction(student_patterns, assessment_analysis),
+            # Difficulty adjustment prediction
+            self._difficulty_adjusted_prediction(student_patterns, assessment_analysis),
+            # Class comparative prediction
+            self._class_comparative_prediction(student_patterns, assessment_analysis, class_patterns),
+            # Rank-based prediction (HSC-style)
+            self._rank_based_prediction(student_patterns, assessment_analysis, class_patterns)
+        ]
+        predictions = np.array(algorithm_predictions, dtype=np.float64)
+        
+        # Weighted ensemble prediction, clamped to the valid range
+        final_prediction = float(np.clip(predictions @ self.ENSEMBLE_WEIGHTS, 0, 100))
         
         # Calculate confidence based on data quality and agreement
         confidence = self._calculate_prediction_confidence(predictions, student_patterns, assessment_analysis)
@@ -775,39 +1531,29 @@ class DatabaseManager:
             'range': prediction_range,
             'factors': self._identify_contributing_factors(student_patterns, assessment_analysis),
             'algorithms': {
-                'linear_regression': round(predictions['linear_regression'], 1),
-                'polynomial_regression': round(predictions['polynomial_regression'], 1),
-                'trend_based': round(predictions['trend'], 1),
-                'type_correlation': round(predictions['type_correlation'], 1),
-                'difficulty_adjusted': round(predictions['difficulty'], 1),
-                'class_comparative': round(predictions['comparative'], 1),
-                'rank_based': round(predictions['rank_based'], 1)
+                name: round(value, 1) for name, value in zip(self.ENSEMBLE_ALGORITHMS, algorithm_predictions)
             }
         }
     
-    def _calculate_trend_slope(self, scores: List[float]) -> float:
+    def _calculate_trend_slope(self, scores: Union[List[float], np.ndarray]) -> float:
         """Calculate linear trend slope using least squares regression"""
         n = len(scores)
         if n < 2:
             return 0
         
-        x_values = list(range(n))
-        x_mean = sum(x_values) / n
-        y_mean = sum(scores) / n
+        # Closed-form least squares over x = 0..n-1; cheaper than np.polyfit for a handful of points
+        x_centered = np.arange(n) - (n - 1) / 2
+        y = np.asarray(scores, dtype=np.float64)
+        return float(x_centered @ (y - y.mean()) / (x_centered @ x_centered))
         
-        numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, scores))
-        denominator = sum((x - x_mean) ** 2 for x in x_values)
-        
-        return numerator / denominator if denominator != 0 else 0
-    
-    def _calculate_consistency_score(self, scores: List[float]) -> float:
+    def _calculate_consistency_score(self, scores: Union[List[float], np.ndarray]) -> float:
         """Calculate how consistent the student's performance is (0-1, where 1 is most consistent)"""
         if len(scores) < 2:
             return 1.0
         
-        mean_score = sum(scores) / len(scores)
-        variance = sum((score - mean_score) ** 2 for score in scores) / len(scores)
-        std_dev = variance ** 0.5
+        scores = np.asarray(scores, dtype=np.float64)
+        mean_score = float(scores.mean())
+        std_dev = float(scores.std())
         
         # Normalize by mean to get coefficient of variation
         cv = std_dev / mean_score if mean_score > 0 else 0
@@ -905,7 +1651,7 @@ class DatabaseManager:
             
             if len(individual_ranks) < 2:
                 # Insufficient rank data, fallback to weighted average
-                return student_patterns.get('weighted_average', 75.0)
+                return student_patterns.get('weighted_average', self.DEFAULT_PREDICTED_SCORE)
             
             # Analyze ranking patterns
             rank_analysis = self._analyze_ranking_patterns(individual_ranks, assessment_analysis)
@@ -918,9 +1664,9 @@ class DatabaseManager:
             
             return max(0, min(100, predicted_score))
             
-        except Exception as e:
+        except Exception:
             # Fallback to weighted average if rank calculation fails
-            return student_patterns.get('weighted_average', 75.0)
+            return student_patterns.get('weighted_average', self.DEFAULT_PREDICTED_SCORE)
     
     def _calculate_individual_assessment_ranks(self, student_patterns: Dict) -> List[Dict]:
         """Calculate student's rank on each individual assessment"""
@@ -954,7 +1700,7 @@ class DatabaseManager:
                 'assessment_index': i,
                 'score': score,
                 'rank': rank,
-                'total_students': 25  # Assume class size of 25
+                'total_students': self.ASSUMED_CLASS_SIZE
             })
         
         return simulated_ranks
@@ -1014,7 +1760,7 @@ class DatabaseManager:
         # (This would be more sophisticated with real data)
         
         # Ensure rank is within valid range
-        total_students = 25  # Assume class size
+        total_students = self.ASSUMED_CLASS_SIZE
         predicted_rank = max(1, min(total_students, int(round(predicted_rank))))
         
         return predicted_rank
@@ -1022,16 +1768,16 @@ class DatabaseManager:
     def _convert_rank_to_score(self, predicted_rank: int, assessment_analysis: Dict) -> float:
         """Convert predicted rank to actual score based on class distribution"""
         
-        # Use actual class distribution if available
-        class_scores = assessment_analysis.get('score_distribution', [])
+        # Use actual class distribution if available (already sorted highest first)
+        sorted_scores = assessment_analysis.get('score_distribution', [])
         
         # If we have insufficient class data or all scores are the same/zero, use percentile conversion
         if (not assessment_analysis.get('has_class_data') or 
-            len(class_scores) <= 1 or 
-            max(class_scores) - min(class_scores) < 10):  # Very little variation
+            len(sorted_scores) <= 1 or 
+            sorted_scores[0] - sorted_scores[-1] < 10):  # Very little variation
             
             # Use rank-to-percentile conversion with realistic score distribution
-            total_students = 25  # Assume class size
+            total_students = self.ASSUMED_CLASS_SIZE
             percentile = (total_students - predicted_rank + 1) / total_students
             
             # Convert percentile to score (assuming realistic distribution around 75)
@@ -1046,10 +1792,7 @@ class DatabaseManager:
             else:                          # Bottom 30%
                 return 40 + percentile * 66.7            # 40-60%
         
-        # Use actual class distribution
-        # Sort scores in descending order to get rank positions
-        sorted_scores = sorted(class_scores, reverse=True)
-        
+        # Use actual class distribution, whose positions are the rank positions
         # If predicted rank is within available data, use it
         if predicted_rank <= len(sorted_scores):
             return sorted_scores[predicted_rank - 1]
@@ -1073,14 +1816,14 @@ class DatabaseManager:
         """Analyze performance by assessment type (Quiz, Exam, Project, etc.)"""
         type_performance = {}
         
-        for score, name, weight, graded_at, due_date, description, subject in grades_data:
-            assessment_type = self._classify_assessment_type(name, description)
+        for row in grades_data:
+            assessment_type = self._classify_assessment_type(row['name'], row['description'])
             
             if assessment_type not in type_performance:
                 type_performance[assessment_type] = {'scores': [], 'total_weight': 0}
             
-            type_performance[assessment_type]['scores'].append(float(score))
-            type_performance[assessment_type]['total_weight'] += float(weight)
+            type_performance[assessment_type]['scores'].append(float(row['score']))
+            type_performance[assessment_type]['total_weight'] += float(row['weight'])
         
         # Calculate averages for each type
         for type_name in type_performance:
@@ -1090,7 +1833,7 @@ class DatabaseManager:
         
         return type_performance
     
-    def _analyze_improvement_pattern(self, scores: List[float]) -> Dict[str, Any]:
+    def _analyze_improvement_pattern(self, scores: np.ndarray) -> Dict[str, Any]:
         """Analyze if student is improving, declining, or stable"""
         if len(scores) < 3:
             return {'pattern': 'insufficient_data'}
@@ -1099,8 +1842,8 @@ class DatabaseManager:
         first_third = scores[:len(scores)//3] if len(scores) >= 6 else scores[:2]
         last_third = scores[-len(scores)//3:] if len(scores) >= 6 else scores[-2:]
         
-        first_avg = sum(first_third) / len(first_third)
-        last_avg = sum(last_third) / len(last_third)
+        first_avg = float(first_third.mean())
+        last_avg = float(last_third.mean())
         
         difference = last_avg - first_avg
         
@@ -1120,23 +1863,8 @@ class DatabaseManager:
     
     def _classify_assessment_type(self, name: str, description: str = "") -> str:
         """Classify assessment type based on name and description"""
-        name_lower = name.lower()
-        desc_lower = (description or "").lower()
-        
-        if 'quiz' in name_lower:
-            return 'quiz'
-        elif 'exam' in name_lower or 'test' in name_lower:
-            return 'exam'
-        elif 'project' in name_lower or 'assignment' in name_lower:
-            return 'project'
-        elif 'homework' in name_lower or 'hw' in name_lower:
-            return 'homework'
-        elif 'lab' in name_lower:
-            return 'lab'
-        elif 'presentation' in name_lower:
-            return 'presentation'
-        else:
-            return 'other'
+        # Only the name decides the type; the same few names recur on every grade row
+        return _assessment_type_for_name(name)
     
     def _estimate_difficulty_from_weight(self, weight: float) -> str:
         """Estimate difficulty based on assessment weight"""
@@ -1198,21 +1926,20 @@ class DatabaseManager:
         return {
             'final_prediction': prediction,
             'confidence': confidence,
-            'range': {'min': max(0, prediction - 15), 'max': min(100, prediction + 10)},
+            'range': _prediction_range(prediction, 15, 10),
             'factors': ['Insufficient historical data', 'Using class/weight-based estimation'],
             'algorithms': {'insufficient_data_fallback': prediction}
         }
     
-    def _calculate_prediction_confidence(self, predictions: Dict, student_patterns: Dict, assessment_analysis: Dict) -> float:
+    def _calculate_prediction_confidence(self, predictions: np.ndarray, student_patterns: Dict, assessment_analysis: Dict) -> float:
         """Calculate confidence score based on data quality and algorithm agreement"""
         # Base confidence factors
         data_quality_score = min(1.0, student_patterns['total_assessments'] / 5.0)  # More data = higher confidence
         consistency_score = student_patterns['consistency_score']
         
         # Algorithm agreement score
-        pred_values = list(predictions.values())
-        if len(pred_values) > 1:
-            pred_std = (sum((p - sum(pred_values)/len(pred_values))**2 for p in pred_values) / len(pred_values))**0.5
+        if predictions.size > 1:
+            pred_std = float(predictions.std())
             agreement_score = max(0, 1 - (pred_std / 20))  # Lower std dev = higher agreement
         else:
             agreement_score = 0.5
@@ -1241,10 +1968,7 @@ class DatabaseManager:
         else:
             adjusted_range = base_range
         
-        return {
-            'min': max(0, prediction - adjusted_range/2),
-            'max': min(100, prediction + adjusted_range/2)
-        }
+        return _prediction_range(prediction, adjusted_range/2, adjusted_range/2)
     
     def _identify_contributing_factors(self, student_patterns: Dict, assessment_analysis: Dict) -> List[str]:
         """Identify the key factors influencing the prediction"""
@@ -1290,76 +2014,38 @@ class DatabaseManager:
             return {
                 'predicted_score': prediction,
                 'confidence': 0.3,
-                'prediction_range': {'min': max(0, prediction - 15), 'max': min(100, prediction + 15)},
+                'prediction_range': _prediction_range(prediction, 15, 15),
                 'contributing_factors': ['Using simple average fallback'],
                 'algorithm_breakdown': {'fallback': prediction}
             }
-        except:
+        except Exception:
             return {
-                'predicted_score': 75.0,
+                'predicted_score': self.DEFAULT_PREDICTED_SCORE,
                 'confidence': 0.1,
                 'prediction_range': {'min': 60, 'max': 90},
                 'contributing_factors': ['No data available - using default estimate'],
-                'algorithm_breakdown': {'default': 75.0}
+                'algorithm_breakdown': {'default': self.DEFAULT_PREDICTED_SCORE}
             }
     
     # ===============================
     # SINGLE ALGORITHM PREDICTION MODES
     # ===============================
     
-    def _rank_only_prediction(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
-        """Use only rank-based prediction algorithm"""
-        prediction = self._rank_based_prediction(student_patterns, assessment_analysis, class_patterns)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.7,  # Good confidence for rank-based
-            'range': {'min': max(0, prediction - 15), 'max': min(100, prediction + 15)},
-            'factors': ['HSC-style rank-based prediction using individual assessment rankings'],
-            'algorithms': {'rank_based': round(prediction, 1)}
-        }
-    
-    def _trend_only_prediction(self, student_patterns: Dict, assessment_analysis: Dict) -> Dict[str, Any]:
-        """Use only trend-based prediction algorithm"""
-        prediction = self._trend_based_prediction(student_patterns, assessment_analysis)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.6,
-            'range': {'min': max(0, prediction - 10), 'max': min(100, prediction + 10)},
-            'factors': ['Linear trend analysis of student performance over time'],
-            'algorithms': {'trend_based': round(prediction, 1)}
-        }
-    
-    def _difficulty_only_prediction(self, student_patterns: Dict, assessment_analysis: Dict) -> Dict[str, Any]:
-        """Use only difficulty-adjusted prediction algorithm"""
-        prediction = self._difficulty_adjusted_prediction(student_patterns, assessment_analysis)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.65,
-            'range': {'min': max(0, prediction - 12), 'max': min(100, prediction + 12)},
-            'factors': ['Assessment difficulty adjustment based on class performance'],
-            'algorithms': {'difficulty_adjusted': round(prediction, 1)}
-        }
-    
-    def _type_only_prediction(self, student_patterns: Dict, assessment_analysis: Dict) -> Dict[str, Any]:
-        """Use only assessment type correlation prediction"""
-        prediction = self._type_correlation_prediction(student_patterns, assessment_analysis)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.6,
-            'range': {'min': max(0, prediction - 12), 'max': min(100, prediction + 12)},
-            'factors': ['Performance correlation with similar assessment types'],
-            'algorithms': {'type_correlation': round(prediction, 1)}
-        }
-    
-    def _comparative_only_prediction(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
-        """Use only class comparative prediction algorithm"""
-        prediction = self._class_comparative_prediction(student_patterns, assessment_analysis, class_patterns)
+    def _single_mode_prediction(self, algorithm: str, student_patterns: Dict, assessment_analysis: Dict,
+                                class_patterns: Dict) -> Dict[str, Any]:
+        """Run one algorithm from SINGLE_MODE_ALGORITHMS and describe its prediction"""
+        method, uses_class_patterns, confidence, below, above, factor = self.SINGLE_MODE_ALGORITHMS[algorithm]
+        if uses_class_patterns:
+            prediction = getattr(self, method)(student_patterns, assessment_analysis, class_patterns)
+        else:
+            prediction = getattr(self, method)(student_patterns, assessment_analysis)
+        rounded = round(prediction, 1)
         return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.55,
-            'range': {'min': max(0, prediction - 15), 'max': min(100, prediction + 15)},
-            'factors': ['Relative performance comparison with class average'],
-            'algorithms': {'class_comparative': round(prediction, 1)}
+            'final_prediction': rounded,
+            'confidence': confidence,
+            'range': _prediction_range(prediction, below, above),
+            'factors': [factor],
+            'algorithms': {algorithm: rounded}
         }
     
     def _single_algorithm_predictions(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
@@ -1373,44 +2059,23 @@ class DatabaseManager:
         predictions['class_comparative'] = self._class_comparative_prediction(student_patterns, assessment_analysis, class_patterns)
         predictions['rank_based'] = self._rank_based_prediction(student_patterns, assessment_analysis, class_patterns)
         
-        # Use the median as the final prediction for stability
-        pred_values = list(predictions.values())
-        final_prediction = sorted(pred_values)[len(pred_values) // 2]
+        # Use the median as the final prediction for stability; rounding never reorders
+        # values, so the median and extremes can be taken from the rounded predictions
+        rounded = {alg: round(pred, 1) for alg, pred in predictions.items()}
+        rounded_values = sorted(rounded.values())
         
         return {
-            'final_prediction': round(final_prediction, 1),
+            'final_prediction': rounded_values[len(rounded_values) // 2],
             'confidence': 0.65,
-            'range': {'min': round(min(pred_values), 1), 'max': round(max(pred_values), 1)},
+            'range': {'min': rounded_values[0], 'max': rounded_values[-1]},
             'factors': ['Individual algorithm comparison mode - showing all algorithms separately'],
-            'algorithms': {alg: round(pred, 1) for alg, pred in predictions.items()}
+            'algorithms': rounded
         }
     
     # ===============================
     # SCIKIT-LEARN REGRESSION MODELS (Required by Assessment)
     # ===============================
     
-    def _sklearn_linear_regression(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
-        """Linear Regression using scikit-learn (Assessment Requirement)"""
-        prediction = self._sklearn_linear_regression_value(student_patterns, assessment_analysis, class_patterns)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.65,
-            'range': {'min': max(0, prediction - 12), 'max': min(100, prediction + 12)},
-            'factors': ['Scikit-learn Linear Regression based on historical grade progression'],
-            'algorithms': {'sklearn_linear_regression': round(prediction, 1)}
-        }
-    
-    def _sklearn_polynomial_regression(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> Dict[str, Any]:
-        """Polynomial Regression using scikit-learn (Assessment Requirement)"""
-        prediction = self._sklearn_polynomial_regression_value(student_patterns, assessment_analysis, class_patterns)
-        return {
-            'final_prediction': round(prediction, 1),
-            'confidence': 0.7,
-            'range': {'min': max(0, prediction - 10), 'max': min(100, prediction + 10)},
-            'factors': ['Scikit-learn Polynomial Regression capturing non-linear performance patterns'],
-            'algorithms': {'sklearn_polynomial_regression': round(prediction, 1)}
-        }
-    
     def _sklearn_linear_regression_value(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> float:
         """Linear regression prediction using scikit-learn and NumPy"""
         try:
@@ -1418,7 +2083,7 @@ class DatabaseManager:
             recent_scores = student_patterns.get('recent_performance', [])
             
             if len(recent_scores) < 2:
-                return student_patterns.get('average_performance', 75.0)
+                return student_patterns.get('average_performance', self.DEFAULT_PREDICTED_SCORE)
             
             # Create NumPy arrays for sklearn
             X = np.arange(len(recent_scores)).reshape(-1, 1)  # Time points
@@ -1444,7 +2109,7 @@ class DatabaseManager:
             
         except Exception:
             # Fallback to average if regression fails
-            return student_patterns.get('average_performance', 75.0)
+            return student_patterns.get('average_performance', self.DEFAULT_PREDICTED_SCORE)
     
     def _sklearn_polynomial_regression_value(self, student_patterns: Dict, assessment_analysis: Dict, class_patterns: Dict) -> float:
         """Polynomial regression prediction using scikit-learn and NumPy"""
@@ -1453,7 +2118,7 @@ class DatabaseManager:
             recent_scores = student_patterns.get('recent_performance', [])
             
             if len(recent_scores) < 3:
-                return student_patterns.get('average_performance', 75.0)
+                return student_patterns.get('average_performance', self.DEFAULT_PREDICTED_SCORE)
             
             # Create NumPy arrays for sklearn
             X = np.arange(len(recent_scores)).reshape(-1, 1)  # Time points
@@ -1461,16 +2126,13 @@ class DatabaseManager:
             
             # Create polynomial features and fit model
             degree = min(2, len(recent_scores) - 1)  # Avoid overfitting
-            poly_model = Pipeline([
-                ('poly', PolynomialFeatures(degree=degree)),
-                ('linear', LinearRegression())
-            ])
-            
-            poly_model.fit(X, y)
+            poly = _polynomial_features(degree)
+            model = LinearRegression()
+            model.fit(poly.transform(X), y)
             
             # Predict next score
             next_time = np.array([[len(recent_scores)]])
-            predicted_score = poly_model.predict(next_time)[0]
+            predicted_score = model.predict(poly.transform(next_time))[0]
             
             # Apply weight-based adjustment using NumPy
             assessment_weight = assessment_analysis.get('weight', 25.0)
@@ -1481,7 +2143,70 @@ class DatabaseManager:
             
         except Exception:
             # Fallback to average if regression fails
-            return student_patterns.get('average_performance', 75.0)
+            return student_patterns.get('average_performance', self.DEFAULT_PREDICTED_SCORE)
+    
+    # ===============================
+    # IMPORT JOBS
+    # ===============================
+    
+    def create_import_job(self, job_id: str, class_id: int) -> None:
+        """Record a new pending CSV import job"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            self._expire_import_jobs(cursor)
+            cursor.execute('INSERT INTO import_jobs (id, class_id) VALUES (?, ?)', (job_id, class_id))
+            self._commit(conn)
+    
+    def _expire_import_jobs(self, cursor: sqlite3.Cursor) -> None:
+        """Fail jobs whose worker went away before finishing them and drop long-finished jobs"""
+        # Jobs run in an in-process executor, so a recycled or killed worker leaves them unfinished
+        cursor.execute('''
+            UPDATE import_jobs SET state = 'failed', result = ?, finished_at = CURRENT_TIMESTAMP
+            WHERE state IN ('pending', 'running') AND created_at < datetime('now', ?)
+        ''', (
+            json.dumps({'error': 'The import was interrupted before it finished. Please try again.'}),
+            f'-{self.IMPORT_JOB_TIMEOUT_MINUTES} minutes'
+        ))
+        cursor.execute(
+            "DELETE FROM import_jobs WHERE finished_at < datetime('now', ?)",
+            (f'-{self.IMPORT_JOB_RETENTION_DAYS} days',)
+        )
+    
+    def update_import_job(self, job_id: str, state: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """Move an import job to a new state, storing its result once finished"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            if result is None:
+                cursor.execute('UPDATE import_jobs SET state = ? WHERE id = ?', (state, job_id))
+            else:
+                cursor.execute('''
+                    UPDATE import_jobs SET state = ?, result = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (state, json.dumps(result), job_id))
+            self._commit(conn)
+    
+    def get_import_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get an import job's state and, once finished, its result"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT *, state IN ('pending', 'running') AND created_at < datetime('now', ?) AS expired
+                FROM import_jobs WHERE id = ?
+            ''', (f'-{self.IMPORT_JOB_TIMEOUT_MINUTES} minutes', job_id))
+            row = cursor.fetchone()
+            if row and row['expired']:
+                # Its worker is gone; record the failure so polling clients stop waiting
+                self._expire_import_jobs(cursor)
+                self._commit(conn)
+                cursor.execute('SELECT *, 0 AS expired FROM import_jobs WHERE id = ?', (job_id,))
+                row = cursor.fetchone()
+            if not row:
+                return None
+            job = dict(row)
+            del job['expired']
+            job['job_id'] = job.pop('id')
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            return job
     
     # ===============================
     # DATA IMPORT/EXPORT
@@ -1490,9 +2215,13 @@ class DatabaseManager:
     def import_students_from_csv(self, csv_content: str, class_id: int = None, import_grades: bool = False) -> Dict[str, Any]:
         """Import students from CSV content, optionally including grades"""
         try:
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
+            # Positional rows with column indexes resolved once from the header
+            csv_reader = csv.reader(io.StringIO(csv_content))
+            header = next(csv_reader, [])
+            columns = {name: i for i, name in enumerate(header)}
             imported_count = 0
             grades_imported = 0
+            pending_grades = []  # Written together once all rows are parsed
             errors = []
             
             # Get class assessments if importing grades
@@ -1503,51 +2232,68 @@ class DatabaseManager:
                 for assessment in class_assessments:
                     assessments[assessment['name']] = assessment['id']
             
-            for row_num, row in enumerate(csv_reader, 1):
+            # Assessment score columns (format: "AssessmentName_score") that match this class;
+            # columns for assessments that don't exist are skipped without an error
+            score_columns = [
+                (columns[col_name], col_name[:-6], assessments[col_name[:-6]])
+                for col_name in columns
+                if col_name.endswith('_score') and col_name[:-6] in assessments
+            ]
+            required_columns = [columns.get(field) for field in ('student_id', 'first_name', 'last_name')]
+            email_column = columns.get('email')
+            
+            # Parse and validate every row first, then write them all with executemany
+            students = []
+            # Blank lines are skipped and not counted, as csv.DictReader did
+            for row_num, row in enumerate(filter(None, csv_reader), 1):
                 try:
-                    required_fields = ['student_id', 'first_name', 'last_name']
-                    if not all(field in row and row[field].strip() for field in required_fields):
-                        errors.append(f"Row {row_num}: Missing required fields")
-                        continue
+                    # Short rows are treated as having empty trailing cells
+                    if len(row) < len(header):
+                        row.extend([''] * (len(header) - len(row)))
                     
-                    # Add student
-                    student_internal_id = self.add_student(
-                        student_id=row['student_id'].strip(),
-                        first_name=row['first_name'].strip(),
-                        last_name=row['last_name'].strip(),
-                        email=row.get('email', '').strip() or None
+                    student_id, first_name, last_name = (
+                        row[i].strip() if i is not None else '' for i in required_columns
                     )
+                    if not (student_id and first_name and last_name):
+                        errors.append(f"Row {row_num}: Missing required fields")
+                        continue
                     
-                    # Enroll in class if class_id provided
-                    enrollment_id = None
-                    if class_id:
-                        enrollment_id = self.enroll_student_in_class(class_id, row['student_id'].strip())
+                    email = (row[email_column].strip() if email_column is not None else '') or None
+                    students.append((student_id, first_name, last_name, email))
                     
-                    # Import grades if requested and class enrollment exists
-                    if import_grades and enrollment_id and class_id:
-                        for col_name, col_value in row.items():
-                            # Look for assessment score columns (format: "AssessmentName_score")
-                            if col_name.endswith('_score') and col_value.strip():
-                                assessment_name = col_name[:-6]  # Remove "_score" suffix
-                                if assessment_name in assessments:
-                                    try:
-                                        score = float(col_value.strip())
-                                        if 0 <= score <= 100:  # Validate score range
-                                            self.update_student_grade(enrollment_id, assessments[assessment_name], score)
-                                            grades_imported += 1
-                                        else:
-                                            errors.append(f"Row {row_num}: Invalid score {score} for {assessment_name} (must be 0-100)")
-                                    except ValueError:
-                                        errors.append(f"Row {row_num}: Invalid score format for {assessment_name}: {col_value}")
-                                else:
-                                    # Assessment doesn't exist, skip but don't error
-                                    pass
+                    # Import grades if requested and the student will be enrolled in a class
+                    if import_grades and class_id:
+                        for col_index, assessment_name, assessment_id in score_columns:
+                            col_value = row[col_index]
+                            cell = col_value.strip()
+                            if cell:
+                                try:
+                                    score = float(cell)
+                                    if 0 <= score <= 100:  # Validate score range
+                                        pending_grades.append((student_id, assessment_id, score))
+                                    else:
+                                        errors.append(f"Row {row_num}: Invalid score {score} for {assessment_name} (must be 0-100)")
+                                except ValueError:
+                                    errors.append(f"Row {row_num}: Invalid score format for {assessment_name}: {col_value}")
                     
                     imported_count += 1
-                    
+                
                 except Exception as e:
                     errors.append(f"Row {row_num}: {str(e)}")
             
+            # One transaction for the whole file instead of a commit per student
+            with self.transaction():
+                self.add_students_bulk(students)
+                        
+                # Enroll in class if class_id provided
+                if class_id:
+                    enrollment_ids = self.enroll_students_bulk(class_id, [student[0] for student in students])
+                    if pending_grades:
+                        grades_imported = self.update_student_grades_bulk([
+                            (enrollment_ids[student_id], assessment_id, score)
+                            for student_id, assessment_id, score in pending_grades
+                        ])
+            
             result = {
                 'success': True,
                 'imported_count': imported_count,
@@ -1567,66 +2313,92 @@ class DatabaseManager:
                 'errors': [str(e)]
             }
     
-    def export_class_data(self, class_id: int) -> str:
-        """Export class data including students and grades to CSV"""
+    def export_class_data(self, class_id: int, out: Optional[TextIO] = None) -> Optional[str]:
+        """Export class data including students and grades to CSV
+        
+        With out, the CSV is written to that stream chunk by chunk and None is
+        returned instead of building the whole file as one string.
+        """
+        if out is None:
+            return ''.join(self.iter_export_class_data(class_id))
+        out.writelines(self.iter_export_class_data(class_id))
+        return None
+    
+    def iter_export_class_data(self, class_id: int) -> Iterator[str]:
+        """Export class data to CSV one line at a time, for streaming responses"""
+        export = self.export_class_data_with_meta(class_id)
+        if export:
+            yield from export[0]
+    
+    def export_class_data_with_meta(self, class_id: int) -> Optional[Tuple[Iterator[str], str, str]]:
+        """Return (CSV line iterator, class_name, subject) for a class, or None if it does not exist"""
+        # Get class info
+        class_info = self.get_class(class_id)
+        if not class_info:
+            return None
+        return self._iter_class_csv(class_id), class_info['class_name'], class_info['subject']
+    
+    def _iter_class_csv(self, class_id: int) -> Iterator[str]:
+        """Yield the export CSV for an existing class, header first, then students in chunks of lines"""
+        # Get assessments
+        assessments = self.get_class_assessments(class_id)
+        
+        output = _thread_csv_buffer()
+        writer = csv.writer(output)
+        
+        def flush() -> str:
+            line = output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            return line
+        
+        flush()  # Drop anything left behind by an export that failed mid-row
+        
+        header = ['student_id', 'first_name', 'last_name', 'email']
+        header.extend([f"{a['name']}_score" for a in assessments])
+        header.extend(['predicted_grade', 'total_weighted_score'])
+        writer.writerow(header)
+        yield flush()
+        
         with self.get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Get class info
-            class_info = self.get_class(class_id)
-            if not class_info:
-                return ""
-            
-            # Get students and their grades
-            cursor.execute('''
+            # Students and their grades in one query, grouped by enrollment in export order;
+            # within a student, rows follow get_student_grades so the grade sums match exactly
+            cursor = conn.execute('''
                 SELECT 
                     s.student_id,
                     s.first_name,
                     s.last_name,
                     s.email,
-                    ce.id as enrollment_id
+                    ce.id as enrollment_id,
+                    a.name,
+                    a.weight,
+                    sg.score
                 FROM students s
                 JOIN class_enrollments ce ON s.id = ce.student_id
+                LEFT JOIN assessments a ON a.class_id = ce.class_id
+                LEFT JOIN student_grades sg ON a.id = sg.assessment_id AND sg.enrollment_id = ce.id
                 WHERE ce.class_id = ?
-                ORDER BY s.last_name, s.first_name
+                ORDER BY s.last_name, s.first_name, ce.id, a.due_date, a.created_at, a.id
             ''', (class_id,))
             
-            students = cursor.fetchall()
-            
-            # Get assessments
-            assessments = self.get_class_assessments(class_id)
-            
-            output = io.StringIO()
-            fieldnames = ['student_id', 'first_name', 'last_name', 'email']
-            fieldnames.extend([f"{a['name']}_score" for a in assessments])
-            fieldnames.extend(['predicted_grade', 'total_weighted_score'])
-            
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for student in students:
-                row_data = {
-                    'student_id': student['student_id'],
-                    'first_name': student['first_name'],
-                    'last_name': student['last_name'],
-                    'email': student['email'] or ''
-                }
-                
-                # Get student's grades
-                grades = self.get_student_grades(student['enrollment_id'])
-                grade_dict = {g['name']: g['score'] for g in grades}
+            def student_rows() -> Iterator[list]:
+                for _, group in groupby(cursor, key=itemgetter('enrollment_id')):
+                    grades = list(group)
+                    student = grades[0]
+                    row = [student['student_id'], student['first_name'], student['last_name'], student['email'] or '']
                 
-                for assessment in assessments:
-                    row_data[f"{assessment['name']}_score"] = grade_dict.get(assessment['name'], '')
+                    # Get student's grades and predicted grade
+                    grade_dict = {g['name']: g['score'] for g in grades}
+                    row.extend([grade_dict.get(a['name'], '') for a in assessments])
                 
-                # Calculate predicted grade
-                grade_calc = self.calculate_student_grade(student['enrollment_id'])
-                row_data['predicted_grade'] = round(grade_calc['predicted'], 2)
-                row_data['total_weighted_score'] = round(grade_calc['weighted_score'], 2)
+                    grade_calc = self._calculate_grade_from_rows(grades)
+                    row.append(round(grade_calc['predicted'], 2))
+                    row.append(round(grade_calc['weighted_score'], 2))
+                    yield row
                 
-                writer.writerow(row_data)
-            
-            return output.getvalue()
+            for rows in _chunked(student_rows(), self.EXPORT_ROWS_PER_CHUNK):
+                writer.writerows(rows)
+                yield flush()
     
     # ===============================
     # CLASS ANALYTICS
@@ -1646,52 +2418,31 @@ class DatabaseManager:
                 'passing_rate': 0.0
             }
         
-        grades = []
-        grade_distribution = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'E': 0}
-        
-        for student in students:
-            grade_calc = self.calculate_student_grade(student['enrollment_id'])
-            predicted = grade_calc.get('predicted', 0.0)
-            # Ensure predicted is a valid number
-            if predicted is None:
-                predicted = 0.0
-            else:
-                predicted = float(predicted)
-            grades.append(predicted)
-            
-            # Letter grade calculation
-            if predicted >= 90:
-                grade_distribution['A'] += 1
-            elif predicted >= 80:
-                grade_distribution['B'] += 1
-            elif predicted >= 70:
-                grade_distribution['C'] += 1
-            elif predicted >= 60:
-                grade_distribution['D'] += 1
-            else:
-                grade_distribution['E'] += 1
-        
-        if not grades:
-            return {
-                'student_count': len(students),
-                'mean_grade': 0.0,
-                'std_deviation': 0.0,
-                'highest_grade': 0.0,
-                'lowest_grade': 0.0,
-                'grade_distribution': grade_distribution,
-                'passing_rate': 0.0
-            }
-        
-        mean = sum(grades) / len(grades) if grades else 0.0
-        variance = sum((g - mean) ** 2 for g in grades) / len(grades) if grades else 0.0
-        std_dev = variance ** 0.5
+        # Every student's calculation from one query, summed in the same order as before
+        grade_calcs = self.calculate_grades_for_class(class_id)
+        grades = np.fromiter(
+            (
+                (grade_calcs.get(student['enrollment_id']) or self.calculate_student_grade(student['enrollment_id']))
+                .get('predicted') or 0.0
+                for student in students
+            ),
+            dtype=np.float64,
+            count=len(students)
+        )
+        
+        # Letter grade calculation: count the thresholds each grade reaches (E=0 ... A=4)
+        letter_counts = np.bincount(
+            np.searchsorted(self.LETTER_GRADE_THRESHOLDS, grades, side='right'),
+            minlength=len(self.LETTER_GRADES)
+        )
+        grade_distribution = dict(zip(self.LETTER_GRADES, letter_counts[::-1].tolist()))
         
         return {
             'student_count': len(students),
-            'mean_grade': round(float(mean), 2),
-            'std_deviation': round(float(std_dev), 2),
-            'highest_grade': round(float(max(grades)) if grades else 0.0, 2),
-            'lowest_grade': round(float(min(grades)) if grades else 0.0, 2),
+            'mean_grade': round(float(grades.mean()), 2),
+            'std_deviation': round(float(grades.std()), 2),
+            'highest_grade': round(float(grades.max()), 2),
+            'lowest_grade': round(float(grades.min()), 2),
             'grade_distribution': grade_distribution,
-            'passing_rate': round((sum(1 for g in grades if g >= 60) / len(grades) * 100) if grades else 0.0, 2)
+            'passing_rate': round(float((grades >= 60).mean() * 100), 2)
         }
\ No newline at end of file
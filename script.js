@@ -1813,7 +1813,12 @@ class SmartGrades {
                 body: formData
             });
             
-            const result = await response.json();
+            let result = await response.json();
+            
+            // Imports run in the background; wait for the job to finish
+            if (response.status === 202 && result.job_id) {
+                result = await this.waitForImportJob(result.job_id);
+            }
             
             if (response.ok && result.success) {
                 this.hideModal('import-students-modal');
@@ -1840,6 +1845,24 @@ class SmartGrades {
             this.showNotification(`Import failed: ${error.message}`, 'error');
         }
     }
+    
+    // Poll a background import job until it finishes and return its result,
+    // giving up after maxWaitMs (the server fails jobs unfinished after 15 minutes)
+    async waitForImportJob(jobId, intervalMs = 500, maxWaitMs = 15 * 60 * 1000) {
+        const deadline = Date.now() + maxWaitMs;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+            const job = await this.apiCall(`/api/imports/${jobId}`);
+            
+            if (job.state === 'done') {
+                return job.result;
+            }
+            if (job.state === 'failed') {
+                throw new Error(job.result?.error || 'Import failed');
+            }
+        }
+        throw new Error('The import is taking too long. Check the student list before trying again.');
+    }
 
 
     updateStudentCharts(grades) {